@@ -0,0 +1,112 @@
+""" Benchmark parse, model build and render stages on synthetic SPL documents.
+
+    python benchmarks/bench.py --scale 1 10 --output bench.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+from idstring.identifier_string import IdentifierStringTemplate, Templates, Rules
+from idstring.model import SplModelProtein
+from idstring.spl import SplDocument
+from idstring.streaming import StreamingSplDocument
+
+try:
+    from benchmarks.synthetic import make_document
+except ImportError:
+    from synthetic import make_document
+
+
+def time_call(func, repeat):
+    """ Return (timings, last result) of calling func repeat times.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def summarize(timings):
+    return {"min": min(timings), "median": statistics.median(timings), "max": max(timings)}
+
+
+def run_case(params, repeat, templates):
+    """ Time every stage on one synthetic document.
+    """
+    data = make_document(**params)
+    template_str = templates.rules["protein_identifier"]
+
+    def load_model(doc):
+        # Sections load lazily; touch them so this stage times the XPath work.
+        model = SplModelProtein(doc)
+        model.chains, model.polymers, model.modifications
+        return model
+
+    def render(model):
+        identifier = IdentifierStringTemplate(templates)
+        model.accept(identifier)
+        return identifier.to_string(template_str)
+
+    stages = {}
+    timings, doc = time_call(lambda: SplDocument(data), repeat)
+    stages["parse"] = summarize(timings)
+    timings, _ = time_call(lambda: StreamingSplDocument(data), repeat)
+    stages["parse_streaming"] = summarize(timings)
+    timings, model = time_call(lambda: load_model(doc), repeat)
+    stages["model"] = summarize(timings)
+    # model is fully loaded, so every repeat times rendering only
+    timings, identifier = time_call(lambda: render(model), repeat)
+    stages["render"] = summarize(timings)
+    return {"params": params, "document_bytes": len(data), "identifier_length": len(identifier),
+            "stages": stages}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--irregular", type=int, default=2)
+    parser.add_argument("--substitutions", type=int, default=16)
+    parser.add_argument("--attachments", type=int, default=4)
+    parser.add_argument("--length", type=int, default=450, help="residues per chain (max 100000)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10],
+                        help="multiply chain, bond and length counts by each factor")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    templates = Templates(Rules)
+    cases = []
+    for scale in args.scale:
+        params = {"chains": args.chains * scale,
+                  "irregular": args.irregular,
+                  "substitutions": args.substitutions * scale,
+                  "attachments": args.attachments * scale,
+                  "length": min(args.length * scale, 100000)}
+        case = run_case(params, args.repeat, templates)
+        case["scale"] = scale
+        cases.append(case)
+        print("scale={:<4} bytes={:<10} ".format(scale, case["document_bytes"]) +
+              " ".join("{}={:.4f}s".format(k, v["median"]) for k, v in case["stages"].items()),
+              file=sys.stderr)
+
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "cases": cases}
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
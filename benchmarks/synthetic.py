@@ -0,0 +1,159 @@
+""" Synthetic SPL protein documents.
+
+    make_document() produces an SPL indexing document with a configurable
+    number of protein chains, irregular amino acids (auxiliary substances),
+    amino acid substitution bonds and attachment bonds. Documents are
+    deterministic for a given seed.
+"""
+import random
+
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+MAIN_CODE_SYSTEM = "2.16.840.1.113883.4.9"
+NCI_CODE_SYSTEM = "2.16.840.1.113883.3.26.1.1"
+DOC_ROOT = "0a7c426c-99d5-4bb7-86d8-69db94b35dbb"
+
+HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<document xmlns="urn:hl7-org:v3" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <id root="{doc_id}" />
+  <code code="64124-1" codeSystem="2.16.840.1.113883.6.1" displayName="Indexing - Substance" />
+  <effectiveTime value="20180624" />
+  <setId root="{set_id}" />
+  <versionNumber value="{version}" />
+  <component>
+    <structuredBody>
+      <component>
+        <section>
+          <code code="48779-3" codeSystem="2.16.840.1.113883.6.1" />
+          <subject>
+            <identifiedSubstance>
+              <identifiedSubstance>
+                <code code="SYNTH00001" codeSystem="{main}" />
+"""
+
+FOOTER = """        </section>
+      </component>
+    </structuredBody>
+  </component>
+</document>
+"""
+
+QUANTITY = """<quantity><numerator value="1" unit="mol" /><denominator value="1" unit="mol" /></quantity>"""
+
+CHAIN = """                <moiety>
+                  <code code="C118424" codeSystem="{nci}" displayName="PROTEIN SUBUNIT" />
+                  {quantity}
+                  <partMoiety><id extension="{local_id}" root="{root}" /></partMoiety>
+                  <subjectOf><characteristic>
+                    <code code="C103240" codeSystem="{nci}" displayName="Chemical Structure" />
+                    <value xsi:type="ED" mediaType="application/x-aa-seq">{sequence}</value>
+                  </characteristic></subjectOf>
+                </moiety>
+"""
+
+BOND = """                    <bond>
+                      <code code="{bond_code}" codeSystem="{nci}" />
+{positions}                      <distalMoiety><id extension="{local_id}" root="{root}" /></distalMoiety>
+                    </bond>
+"""
+
+MODIFICATION = """                <moiety>
+                  <code code="C118425" codeSystem="{nci}" displayName="STRUCTURAL MODIFICATION" />
+                  <partMoiety>
+                    <id extension="{mod_id}" root="{root}" />
+                    <code code="{code}" codeSystem="{root}" />
+{bonds}                  </partMoiety>
+                </moiety>
+"""
+
+IRREGULAR = """          <subject>
+            <identifiedSubstance>
+              <identifiedSubstance>
+                <code code="{code}" codeSystem="{root}" />
+                <asSpecializedKind><generalizedMaterialKind>
+                  <code code="{moiety_code}" codeSystem="{main}" />
+                </generalizedMaterialKind></asSpecializedKind>
+                <moiety>
+                  {quantity}
+                  <partMoiety><code code="{moiety_code}" codeSystem="{main}" /></partMoiety>
+                  <subjectOf><characteristic>
+                    <code code="C103240" codeSystem="{nci}" />
+                    <value xsi:type="ED" mediaType="application/x-mdl-molfile"><![CDATA[{molfile}]]></value>
+                  </characteristic></subjectOf>
+                  <subjectOf><characteristic>
+                    <code code="C103240" codeSystem="{nci}" />
+                    <value xsi:type="ED" mediaType="application/x-inchi-key">{inchi_key}</value>
+                  </characteristic></subjectOf>
+                </moiety>
+                <moiety>
+                  <code code="C118427" codeSystem="{nci}" />
+                  <positionNumber value="1" /><positionNumber value="2" />
+                  <partMoiety />
+                </moiety>
+                <moiety>
+                  <code code="C118427" codeSystem="{nci}" />
+                  <positionNumber value="3" /><positionNumber value="4" />
+                  <partMoiety />
+                </moiety>
+              </identifiedSubstance>
+            </identifiedSubstance>
+          </subject>
+"""
+
+
+def make_document(chains=4, irregular=1, substitutions=16, attachments=0, length=450,
+                  molfile_lines=30, version=1, seed=0):
+    """ Return synthetic SPL document as UTF-8 bytes.
+    :chains: number of protein chains
+    :irregular: number of irregular amino acids (auxiliary substances)
+    :substitutions: number of substitution moieties, two bonds each
+    :attachments: number of attachment bonds
+    :length: amino acid sequence length of every chain
+    :molfile_lines: size of the molfile embedded in every auxiliary substance
+    """
+    rnd = random.Random(seed)
+
+    def letters(n, alphabet="ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
+        return "".join(rnd.choice(alphabet) for _ in range(n))
+
+    def position():
+        return rnd.randint(1, length)
+
+    values = dict(main=MAIN_CODE_SYSTEM, nci=NCI_CODE_SYSTEM, root=DOC_ROOT, quantity=QUANTITY)
+    out = [HEADER.format(doc_id=DOC_ROOT, set_id="5b0e4ba9-0549-c7e0-4619-42c6579bb53f",
+                         version=version, **values)]
+
+    chain_ids = ["SU{}".format(i + 1) for i in range(chains)]
+    for local_id in chain_ids:
+        sequence = "".join(rnd.choice(AMINO_ACIDS) for _ in range(length))
+        out.append(CHAIN.format(local_id=local_id, sequence=sequence, **values))
+
+    codes = ["irreg-{}".format(i + 1) for i in range(irregular)]
+    for index in range(substitutions if codes else 0):
+        bonds = []
+        for cp in (1, 2):
+            positions = ("                      <positionNumber value=\"{}\" />\n"
+                         "                      <positionNumber value=\"{}\" />\n").format(cp, position())
+            bonds.append(BOND.format(bond_code="C118426", positions=positions,
+                                     local_id=rnd.choice(chain_ids), **values))
+        out.append(MODIFICATION.format(mod_id="M{}".format(index + 1), code=rnd.choice(codes),
+                                       bonds="".join(bonds), **values))
+
+    for index in range(attachments):
+        positions = "                      <positionNumber value=\"{}\" />\n".format(position())
+        bond = BOND.format(bond_code="C14050", positions=positions,
+                           local_id=rnd.choice(chain_ids), **values)
+        out.append(MODIFICATION.format(mod_id="G{}".format(index + 1), code="glycan-{}".format(index % 5),
+                                       bonds=bond, **values))
+
+    out.append("              </identifiedSubstance>\n            </identifiedSubstance>\n          </subject>\n")
+
+    for code in codes:
+        molfile = "\n".join("    {:.4f}    {:.4f}    0.0000 C   0  0".format(rnd.random(), rnd.random())
+                            for _ in range(molfile_lines))
+        inchi_key = "{}-{}-N".format(letters(14), letters(10))
+        out.append(IRREGULAR.format(code=code, moiety_code=letters(10), molfile=molfile,
+                                    inchi_key=inchi_key, **values))
+
+    out.append(FOOTER)
+    return "".join(out).encode("utf-8")
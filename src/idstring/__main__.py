@@ -1,14 +1,136 @@
+import argparse
+import functools
+import json
 import sys
 
-from idstring.identifier_string import IdentifierStringTemplate, Templates, Rules
-from idstring.model import SplModelProtein
+from idstring.identifier_string import Templates, Rules
+from idstring.batch import (iter_sources, process_source, run_batch, write_results, format_error,
+                            open_output, FORMATS)
+from idstring.cache import IdentifierCache
+from idstring import incremental
+from idstring.duplicates import DuplicateIndex, DuplicateIndexError
+from idstring.config import ConfigError, load_config, DEFAULT_RULE_SET
 from idstring.spl import SplDocument
+from idstring.streaming import StreamingSplDocument
+from idstring.stats import Stats, observing
 
 
-if __name__ == "__main__":
-    docpath = sys.argv[1]
-    identifier = IdentifierStringTemplate(Templates(Rules))
-    model = SplModelProtein(SplDocument(docpath))
-    model.accept(identifier)
-    print(identifier.to_string(Rules["protein_identifier"]))
+def make_parser():
+    parser = argparse.ArgumentParser(prog="idstring",
+                                     description="Generate identifier strings for SPL XML documents.")
+    parser.add_argument("paths", nargs="+",
+                        help="SPL document path; in batch mode also a directory, glob or \"-\" for a file list on stdin")
+    parser.add_argument("--batch", action="store_true",
+                        help="process every document in one run and print one result per line")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="tsv",
+                        help="batch output format (default: tsv)")
+    parser.add_argument("--details", action="store_true",
+                        help="add setId, versionNumber and section fragments to every record")
+    parser.add_argument("--index", metavar="PATH",
+                        help="store identifier and section digests of the batch in the SQLite "
+                             "duplicate index at PATH; implies --details")
+    parser.add_argument("--reset-index", action="store_true",
+                        help="empty an --index built with other rules instead of failing")
+    parser.add_argument("--output", "-o", metavar="PATH", default="-",
+                        help="batch output file, gzip compressed if PATH ends with .gz (default: stdout)")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="number of worker processes in batch mode, 0 for one per CPU (default: 1)")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="documents sent to a worker at a time (default: 16)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="parse documents incrementally, keeping only the elements the model needs")
+    parser.add_argument("--mmap", action="store_true",
+                        help="parse documents from memory-mapped files")
+    parser.add_argument("--huge-tree", action="store_true",
+                        help="lift XML parser limits on tree depth and text size")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="SQLite identifier cache keyed by document content")
+    parser.add_argument("--cache-size", type=int, default=1000000,
+                        help="maximum number of cached identifiers (default: 1000000)")
+    parser.add_argument("--config", metavar="PATH",
+                        help="rules configuration file (JSON, YAML or TOML)")
+    parser.add_argument("--rule-set", default="protein.default",
+                        help="CLASS.NAME of the rule set in --config (default: protein.default)")
+    parser.add_argument("--template-cache", metavar="DIR",
+                        help="directory of the parsed template cache")
+    parser.add_argument("--state", metavar="PATH",
+                        help="reuse model data of the previous document version saved in PATH and "
+                             "save this one; documents are taken as successive versions")
+    parser.add_argument("--stats", action="store_true",
+                        help="print stage timings and counters as JSON to stderr")
+    return parser
+
+
+def main(argv=None):
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.cache and args.mmap:
+        parser.error("--mmap cannot be combined with --cache")
+    if args.state and (args.batch or args.cache):
+        parser.error("--state cannot be combined with --batch or --cache")
+    if (args.details or args.index) and args.cache:
+        parser.error("--details and --index cannot be combined with --cache")
+    if args.index and not args.batch:
+        parser.error("--index requires --batch")
+    with observing(Stats() if args.stats else None) as stats:
+        try:
+            return run(args)
+        except ConfigError as e:
+            raise SystemExit("{}: {}".format(args.config, e))
+        except DuplicateIndexError as e:
+            raise SystemExit("{}; use --reset-index to rebuild it".format(e))
+        finally:
+            if stats is not None:
+                json.dump(stats.as_dict(), sys.stderr, indent=2)
+                sys.stderr.write("\n")
+
 
+def run(args):
+    rules = Rules
+    if args.config:
+        substance_class, _, name = args.rule_set.partition(".")
+        rules = load_config(args.config, args.template_cache).rules(substance_class, name or DEFAULT_RULE_SET)
+    templates = Templates(rules)
+    document_class = StreamingSplDocument if args.streaming else SplDocument
+    if args.mmap:
+        document_class = document_class.from_mmap
+    if args.huge_tree:
+        document_class = functools.partial(document_class, huge_tree=True)
+    cache = IdentifierCache(args.cache, rules, args.cache_size) if args.cache else None
+    if args.state:
+        state = incremental.IncrementalState.load(args.state)
+        for docpath in args.paths:
+            try:
+                print(incremental.generate_identifier(docpath, templates, state, document_class=document_class))
+            except Exception as e:
+                raise SystemExit("{}: {}".format(docpath, format_error(e)))
+        state.save(args.state)
+        return 0
+    if not args.batch:
+        for docpath in args.paths:
+            result = process_source(docpath, templates, document_class=document_class, cache=cache)
+            if not result.ok:
+                raise SystemExit("{}: {}".format(docpath, result.error))
+            print(result.identifier)
+        return 0
+
+    details = args.details or bool(args.index)
+    results = run_batch(iter_sources(args.paths), templates,
+                        jobs=args.jobs, chunksize=args.chunksize,
+                        document_class=document_class, cache=cache, details=details)
+    index = DuplicateIndex(args.index, rules, args.reset_index) if args.index else None
+    out = open_output(args.output)
+    try:
+        if index is not None:
+            results = index.index_results(results)
+        failed = write_results(results, out, args.format, details=details)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if index is not None:
+            index.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+""" Asyncio API.
+
+    Identifier generation from coroutines: file reads run on the default
+    thread pool and parsing, model building and rendering run on a
+    configurable concurrent.futures executor (threads or processes),
+    so the event loop is never blocked.
+
+    identifier = await generate_identifier("protein.xml", Rules)
+
+    async for result in generate_identifiers(paths, Rules, executor=pool, concurrency=16):
+        print(result.path, result.identifier, result.error)
+"""
+import asyncio
+import collections
+import os
+
+from idstring.archive import ArchiveMember, open_source, source_name
+from idstring.batch import BatchResult, format_error
+from idstring.cache import rules_fingerprint
+from idstring.identifier_string import Templates
+from idstring.identifier_string import generate_identifier as generate_identifier_sync
+from idstring.spl import SplDocument
+
+
+_templates = {}
+
+
+def get_templates(rules):
+    """ Return Templates for rules, built once per process.
+    """
+    key = rules_fingerprint(rules)
+    templates = _templates.get(key)
+    if templates is None:
+        templates = _templates[key] = Templates(rules)
+    return templates
+
+
+def read_bytes(path):
+    with open_source(path) as src:
+        return src.read()
+
+
+class IdentifierError(Exception):
+    """ Error of identifier generation in an executor.
+        The message is the formatted original error; exceptions such as
+        lxml's XMLSyntaxError cannot be sent back from a worker process.
+    """
+
+
+def _generate(data, rules, template_name, document_class):
+    """ Return (identifier, error).
+    """
+    try:
+        return generate_identifier_sync(data, get_templates(rules), template_name, document_class), None
+    except Exception as e:
+        return None, format_error(e)
+
+
+async def read_source(source):
+    """ Return document bytes; paths are read on the default thread pool.
+    :source: file path, ArchiveMember or bytes
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, read_bytes, source)
+
+
+async def generate_identifier(source, rules, template_name="protein_identifier", executor=None,
+                              document_class=SplDocument):
+    """ Return identifier string of an SPL document.
+    :source: file path, ArchiveMember or document bytes
+    :rules: template rules
+    :executor: concurrent.futures executor for the CPU bound work;
+               the loop's default executor if None
+    :document_class: callable that makes an SplDocument from bytes;
+                     must be picklable for a process executor
+        Errors of parsing and rendering are raised as IdentifierError.
+    """
+    data = await read_source(source)
+    loop = asyncio.get_running_loop()
+    identifier, error = await loop.run_in_executor(executor, _generate, bytes(data), rules, template_name,
+                                                   document_class)
+    if error is not None:
+        raise IdentifierError(error)
+    return identifier
+
+
+async def _iterate(sources):
+    if hasattr(sources, "__aiter__"):
+        async for source in sources:
+            yield source
+    else:
+        for source in sources:
+            yield source
+
+
+async def generate_identifiers(sources, rules, template_name="protein_identifier", executor=None,
+                               concurrency=8, document_class=SplDocument):
+    """ Generate identifiers for many documents concurrently.
+        Yield BatchResult per source in input order. At most concurrency
+        documents are read or processed at a time; the next source is not
+        taken from sources until a slot is free, so a fast producer is
+        held back by the consumer.
+    :sources: iterable or async iterable of file paths or document bytes
+    """
+    async def run(source):
+        if isinstance(source, ArchiveMember):
+            path = source_name(source)
+        else:
+            path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+        try:
+            identifier = await generate_identifier(source, rules, template_name, executor, document_class)
+            return BatchResult(path, identifier)
+        except IdentifierError as e:
+            return BatchResult(path, error=str(e))
+        except Exception as e:
+            return BatchResult(path, error=format_error(e))
+
+    pending = collections.deque()
+    try:
+        async for source in _iterate(sources):
+            pending.append(asyncio.ensure_future(run(source)))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,147 @@
+""" SPL documents stored in zip and tar archives.
+
+    Archive members are read without extracting them to disk. Members of
+    a zip file are opened and decompressed straight into the parser;
+    members of tar files and of zip files nested in an archive are read
+    into memory while the archive is walked, as they cannot be reached
+    again without reading the archive from the start.
+
+    ArchiveMember objects are small and picklable, so they can be handed
+    out to worker processes like file paths.
+"""
+import io
+import os
+import tarfile
+import threading
+import zipfile
+
+
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MEMBER_SUFFIXES = (".xml",)
+SEPARATOR = "!"
+
+
+def is_archive(path):
+    """ Return True if path names a zip or tar archive.
+    """
+    return isinstance(path, str) and path.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+class ArchiveMember(object):
+    """ SPL document stored in an archive.
+    """
+    __slots__ = ("archive", "name", "data", "size")
+
+    def __init__(self, archive, name, data=None, size=0):
+        """
+        :archive: path of the zip file holding the member; for members
+                  read into memory, the archive path used in messages
+        :name: member name
+        :data: member bytes, or None to read the member from the zip file
+        :size: uncompressed size in bytes
+        """
+        self.archive = archive
+        self.name = name
+        self.data = data
+        self.size = size
+
+    def open(self):
+        """ Return binary file object of the member content.
+        """
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return zip_file(self.archive).open(self.name)
+
+    def read(self):
+        if self.data is not None:
+            return self.data
+        with self.open() as src:
+            return src.read()
+
+    def __str__(self):
+        return "{}{}{}".format(self.archive, SEPARATOR, self.name)
+
+    def __repr__(self):
+        return "ArchiveMember({!r}, {!r})".format(self.archive, self.name)
+
+
+_zip_files = {}
+_zip_files_pid = None
+_zip_files_lock = threading.Lock()
+
+
+def zip_file(path):
+    """ Return open ZipFile of path, shared by the threads of a process.
+        The central directory of an archive is read once per process.
+    """
+    global _zip_files_pid
+    with _zip_files_lock:
+        if _zip_files_pid != os.getpid():
+            # Forked workers must not share the parent's file offsets.
+            _zip_files.clear()
+            _zip_files_pid = os.getpid()
+        try:
+            return _zip_files[path]
+        except KeyError:
+            archive = zipfile.ZipFile(path)
+            _zip_files[path] = archive
+            return archive
+
+
+def iter_archive(path):
+    """ Yield ArchiveMember for every SPL document in an archive,
+        including documents in zip files nested in the archive.
+    """
+    if path.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(path) as archive:
+            yield from _iter_zip(archive, path, False)
+    else:
+        with tarfile.open(path, "r|*") as archive:
+            yield from _iter_tar(archive, path)
+
+
+def _iter_zip(archive, archive_name, in_memory):
+    """
+    :in_memory: read members into memory
+    """
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = info.filename.lower()
+        if name.endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(io.BytesIO(archive.read(info))) as nested:
+                yield from _iter_zip(nested, str(ArchiveMember(archive_name, info.filename)), True)
+        elif name.endswith(MEMBER_SUFFIXES):
+            data = archive.read(info) if in_memory else None
+            yield ArchiveMember(archive_name, info.filename, data, info.file_size)
+
+
+def _iter_tar(archive, archive_name):
+    for info in archive:
+        if not info.isfile():
+            continue
+        name = info.name.lower()
+        if name.endswith(ZIP_SUFFIXES):
+            data = archive.extractfile(info).read()
+            with zipfile.ZipFile(io.BytesIO(data)) as nested:
+                yield from _iter_zip(nested, str(ArchiveMember(archive_name, info.name)), True)
+        elif name.endswith(MEMBER_SUFFIXES):
+            data = archive.extractfile(info).read()
+            yield ArchiveMember(archive_name, info.name, data, info.size)
+
+
+def open_source(source):
+    """ Return binary file object of a document path or ArchiveMember.
+    """
+    if isinstance(source, ArchiveMember):
+        return source.open()
+    return open(source, 'rb')
+
+
+def source_name(source):
+    """ Return name of a document source used in results.
+    """
+    if isinstance(source, ArchiveMember):
+        return str(source)
+    return source
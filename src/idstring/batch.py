@@ -0,0 +1,319 @@
+""" Batch processing: generate identifiers for many SPL documents
+    in one process, reusing a single Templates instance.
+"""
+import collections
+import csv
+import glob
+import gzip
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from idstring.archive import is_archive, iter_archive, source_name
+from idstring.cache import cached_identifier
+from idstring.identifier_string import IdentifierStringTemplate, Templates, compile_template, generate_identifier
+from idstring.model import SplModelProtein
+from idstring.spl import SplDocument
+from idstring.stats import Stats, observer, observing
+
+
+GLOB_CHARS = "*?["
+
+
+def iter_sources(paths, stdin=None):
+    """ Expand command line arguments into SPL document sources.
+    :paths: collection of file paths, directories, glob patterns or "-".
+            A directory yields every *.xml file and the members of every
+            archive below it, "-" reads one path per line from stdin.
+            A zip or tar archive yields an ArchiveMember per *.xml
+            document in it.
+    """
+    for path in paths:
+        if path == "-":
+            for line in (stdin or sys.stdin):
+                line = line.strip()
+                if line:
+                    yield from expand_archive(line)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".xml"):
+                        yield os.path.join(root, name)
+                    elif is_archive(name):
+                        yield from iter_archive(os.path.join(root, name))
+        elif not os.path.exists(path) and any(c in path for c in GLOB_CHARS):
+            for name in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(name):
+                    yield from expand_archive(name)
+        else:
+            yield from expand_archive(path)
+
+
+def expand_archive(path):
+    """ Yield members of an archive, or the path itself.
+    """
+    if is_archive(path) and os.path.isfile(path):
+        yield from iter_archive(path)
+    else:
+        yield path
+
+
+class BatchResult(object):
+    """ Outcome of processing one SPL document.
+        set_id, version_number and fragments are filled in by
+        describe_source only.
+    """
+    def __init__(self, path, identifier=None, error=None, set_id=None, version_number=None, fragments=None):
+        """
+        :fragments: {section name: rendered items} of the identifier
+        """
+        self.path = path
+        self.identifier = identifier
+        self.error = error
+        self.set_id = set_id
+        self.version_number = version_number
+        self.fragments = fragments
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def process_source(path, templates, template_name="protein_identifier", document_class=SplDocument,
+                   cache=None, details=False):
+    """ Return BatchResult for a single SPL document.
+        Errors are captured in the result instead of being raised.
+    :document_class: callable that makes an SplDocument from a source
+    :cache: IdentifierCache or None; with a cache the document bytes
+            are read once and parsed only on a cache miss
+    :details: add setId, versionNumber and fragments to the result;
+              the cache is not used
+    """
+    try:
+        if details:
+            return describe_source(path, templates, template_name, document_class)
+        if cache is None:
+            identifier = generate_identifier(path, templates, template_name, document_class)
+        else:
+            identifier = cached_identifier(cache, path,
+                                           lambda x: generate_identifier(x, templates, template_name, document_class),
+                                           template_name)
+        return BatchResult(source_name(path), identifier)
+    except Exception as e:
+        return BatchResult(source_name(path), error=format_error(e))
+
+
+def describe_source(path, templates, template_name="protein_identifier", document_class=SplDocument):
+    """ Return BatchResult with the document header and the rendered
+        items of every section next to the identifier.
+    """
+    observer().count("documents")
+    template_str = templates.rules[template_name]
+    document = document_class(path)
+    identifier = IdentifierStringTemplate(templates)
+    SplModelProtein(document).accept(identifier, compile_template(template_str).variable_names)
+    fragments = {name: [x if isinstance(x, str) else x.to_string() for x in items]
+                 for name, items in identifier.context.items()}
+    # Items are rendered once; the identifier is made from the same strings.
+    identifier.context = dict(fragments)
+    return BatchResult(source_name(path), identifier.to_string(template_str),
+                       set_id=document.set_id(),
+                       version_number=document.version_number(),
+                       fragments=fragments)
+
+
+def format_error(e):
+    """ Return error description stored in BatchResult.
+    """
+    return "{}: {}".format(type(e).__name__, e)
+
+
+def run_batch(sources, templates, jobs=1, chunksize=16, **options):
+    """ Generate identifiers for a collection of SPL documents.
+        Yield BatchResult per document in input order.
+    :jobs: number of worker processes; 1 runs in the calling process,
+           0 or None uses one worker per CPU
+    :chunksize: number of documents sent to a worker at a time
+    :options: keyword arguments of process_source
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    if jobs == 1:
+        for path in sources:
+            yield process_source(path, templates, **options)
+    else:
+        yield from run_parallel(sources, templates.rules, jobs, chunksize, **options)
+
+
+_worker = {}
+
+
+def _init_worker(rules, options, collect_stats):
+    """ Process pool initializer: build templates once per worker.
+    :options: keyword arguments passed to process_source
+    :collect_stats: return Stats totals of every chunk to the parent process
+    """
+    _worker["templates"] = Templates(rules)
+    _worker["options"] = options
+    _worker["collect_stats"] = collect_stats
+
+
+def _process_chunk(paths):
+    """ Return (results, stats totals or None) of a chunk of documents.
+    """
+    if not _worker["collect_stats"]:
+        return [process_source(x, _worker["templates"], **_worker["options"]) for x in paths], None
+    with observing(Stats()) as stats:
+        results = [process_source(x, _worker["templates"], **_worker["options"]) for x in paths]
+    return results, stats.as_dict()
+
+
+def iter_chunks(iterable, size):
+    """ Split iterable into lists of at most size elements.
+    """
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_parallel(sources, rules, jobs=None, chunksize=16, prefetch=4, **options):
+    """ Generate identifiers on a pool of worker processes.
+        Documents are sent to workers in chunks; at most jobs * prefetch
+        chunks are in flight, so arbitrarily long source lists are streamed.
+        Yield BatchResult per document in input order.
+    :rules: template rules used to build Templates in every worker
+    :options: keyword arguments of process_source; they are pickled
+              and sent to every worker once
+        Stage timings and counters recorded by workers are merged into
+        the current observer of the calling process.
+    """
+    obs = observer()
+    jobs = jobs or os.cpu_count() or 1
+    chunks = iter_chunks(sources, max(1, chunksize))
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_init_worker,
+                             initargs=(rules, options, obs.enabled)) as executor:
+        pending = collections.deque(executor.submit(_process_chunk, x)
+                                    for x in itertools.islice(chunks, jobs * prefetch))
+        while pending:
+            results, totals = pending.popleft().result()
+            if totals is not None:
+                obs.merge(totals)
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(executor.submit(_process_chunk, chunk))
+            yield from results
+
+
+def format_tsv(result):
+    """ Return result as a tab separated line: path, identifier, error.
+    """
+    fields = [result.path, result.identifier or "", result.error or ""]
+    return "\t".join(x.replace("\t", " ").replace("\n", " ") for x in fields)
+
+
+def format_tsv_details(result):
+    """ Return result as a tab separated line: path, identifier, error,
+        setId, versionNumber and fragments as a JSON object.
+    """
+    fields = [result.path, result.identifier or "", result.error or "",
+              result.set_id or "", result.version_number or "",
+              json.dumps(result.fragments) if result.fragments is not None else ""]
+    return "\t".join(x.replace("\t", " ").replace("\n", " ") for x in fields)
+
+
+def format_jsonl(result):
+    """ Return result as a JSON object on a single line.
+    """
+    record = {"path": result.path,
+              "identifier": result.identifier,
+              "error": result.error}
+    if result.fragments is not None:
+        record["setId"] = result.set_id
+        record["versionNumber"] = result.version_number
+        record["fragments"] = result.fragments
+    return json.dumps(record)
+
+
+CSV_COLUMNS = ["path", "setId", "versionNumber", "identifier", "error", "fragments"]
+
+
+class _Lines(object):
+    """ csv writer target that keeps the formatted line.
+    """
+    def write(self, line):
+        self.line = line
+
+
+_csv_lines = _Lines()
+_csv_writer = csv.writer(_csv_lines, lineterminator="")
+
+
+def format_csv(result):
+    """ Return result as a CSV row; fragments are a JSON object.
+    """
+    _csv_writer.writerow([result.path,
+                          result.set_id or "",
+                          result.version_number or "",
+                          result.identifier or "",
+                          result.error or "",
+                          json.dumps(result.fragments) if result.fragments is not None else ""])
+    return _csv_lines.line
+
+
+FORMATS = {
+    "tsv": format_tsv,
+    "jsonl": format_jsonl,
+    "csv": format_csv,
+}
+
+HEADERS = {
+    "csv": ",".join(CSV_COLUMNS),
+}
+
+
+def open_output(path):
+    """ Return text file for writing results; gzip compressed if
+        path ends with .gz, stdout for "-".
+    """
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_results(results, out, fmt="tsv", buffer_size=1 << 20, details=False):
+    """ Write results one per line, as they are produced.
+        Lines are collected and written in blocks of about buffer_size
+        characters.
+        Return number of failed documents.
+    :details: results carry setId, versionNumber and fragments; TSV
+              lines get three more columns for them
+    """
+    formatter = format_tsv_details if details and fmt == "tsv" else FORMATS[fmt]
+    failed = 0
+    lines = []
+    if fmt in HEADERS:
+        lines.append(HEADERS[fmt])
+        lines.append("\n")
+    size = 0
+    for result in results:
+        if not result.ok:
+            failed += 1
+        line = formatter(result)
+        lines.append(line)
+        lines.append("\n")
+        size += len(line) + 1
+        if size >= buffer_size:
+            out.write("".join(lines))
+            lines = []
+            size = 0
+    if lines:
+        out.write("".join(lines))
+    return failed
@@ -0,0 +1,124 @@
+""" Content-addressed identifier cache.
+
+    Identifiers are stored in an SQLite database keyed by the SHA-256
+    digest of the raw document bytes and the name of the rendered rule.
+    The database remembers a fingerprint of the rules it was filled with;
+    opening it with different rules discards every stored identifier.
+    The number of entries is bounded, least recently used entries are
+    evicted first.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+
+from idstring.archive import open_source
+
+
+def rules_fingerprint(rules):
+    """ Return digest of a rules dictionary.
+    """
+    text = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_digest(data):
+    """ Return digest of raw document bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class IdentifierCache(object):
+    """ On-disk identifier cache.
+    """
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS identifiers ("
+        " digest TEXT, template TEXT, identifier TEXT, accessed REAL,"
+        " PRIMARY KEY (digest, template))",
+        "CREATE INDEX IF NOT EXISTS identifiers_accessed ON identifiers (accessed)",
+    ]
+
+    def __init__(self, path, rules, max_entries=1000000):
+        """
+        :path: database file path
+        :rules: rules dictionary the cached identifiers are rendered with
+        :max_entries: maximum number of stored identifiers
+        """
+        self.path = path
+        self.fingerprint = rules_fingerprint(rules)
+        self.max_entries = max_entries
+        self._open()
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            self._db.execute(statement)
+        self._count = None
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != self.fingerprint:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute("DELETE FROM identifiers")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+
+    def __getstate__(self):
+        return {"path": self.path, "fingerprint": self.fingerprint, "max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def get(self, digest, template_name):
+        """ Return stored identifier or None.
+        """
+        row = self._db.execute("SELECT identifier FROM identifiers WHERE digest = ? AND template = ?",
+                               (digest, template_name)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE identifiers SET accessed = ? WHERE digest = ? AND template = ?",
+                         (time.time(), digest, template_name))
+        return row[0]
+
+    def put(self, digest, template_name, identifier):
+        """ Store identifier and evict least recently used entries
+            above the size limit.
+        """
+        self._db.execute("INSERT OR REPLACE INTO identifiers VALUES (?, ?, ?, ?)",
+                         (digest, template_name, identifier, time.time()))
+        if self._count is None:
+            self._count = len(self)
+        else:
+            self._count += 1
+        if self._count > self.max_entries:
+            self._db.execute("DELETE FROM identifiers WHERE rowid IN "
+                             "(SELECT rowid FROM identifiers ORDER BY accessed LIMIT ?)",
+                             (self._count - self.max_entries,))
+            self._count = len(self)
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM identifiers").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def cached_identifier(cache, path, generate, template_name="protein_identifier"):
+    """ Return identifier of the document at path, generating it on a cache miss.
+    :generate: callable that makes identifier from raw document bytes
+    """
+    with open_source(path) as src:
+        data = src.read()
+    digest = document_digest(data)
+    identifier = cache.get(digest, template_name)
+    if identifier is None:
+        identifier = generate(data)
+        cache.put(digest, template_name, identifier)
+    return identifier
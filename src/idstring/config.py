@@ -0,0 +1,255 @@
+""" Template rules configuration files.
+
+    Rules are read from JSON, YAML or TOML files. A file holds named rule
+    sets grouped by substance class:
+
+        [protein.default]
+        protein_identifier = "/chains={{ chains }}/poly={{ polymers }}/subs={{ substitutions }}"
+        chain = "{{ name }}:{{ value }}"
+        ...
+
+        [protein.compact]
+        protein_identifier = "/chains={{ chains }}"
+        chain = "{{ name }}:{{ length }}:{{ digest }}"
+
+    A file holding a single mapping of rule names to template strings is
+    the "default" rule set of the "protein" class.
+
+    Parsed templates can be cached on disk, keyed by the SHA-256 of the
+    file content, so start-up skips parsing. ConfigFile re-reads a file
+    when its modification time or size changes.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from idstring.identifier_string import Templates, compile_template, parse
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+DEFAULT_CLASS = "protein"
+DEFAULT_RULE_SET = "default"
+CACHE_VERSION = 1
+
+
+class ConfigError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def parse_config_text(data, file_format):
+    """ Return configuration mapping from raw file content.
+    :file_format: "json", "yaml" or "toml"
+    """
+    if file_format == "json":
+        return json.loads(data.decode("utf-8"))
+    if file_format == "toml":
+        if tomllib is None:
+            raise ConfigError("TOML configuration requires Python 3.11 or the tomli package")
+        return tomllib.loads(data.decode("utf-8"))
+    if file_format == "yaml":
+        if yaml is None:
+            raise ConfigError("YAML configuration requires the PyYAML package")
+        return yaml.safe_load(data)
+    raise ConfigError("Unsupported configuration format \"{}\"".format(file_format))
+
+
+def config_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return {".json": "json", ".toml": "toml", ".yaml": "yaml", ".yml": "yaml"}.get(ext, ext.lstrip("."))
+
+
+def normalize_rule_sets(obj):
+    """ Return {substance class: {rule set name: rules}} from a parsed file.
+    """
+    if not isinstance(obj, dict):
+        raise ConfigError("Configuration must be a mapping")
+    if all(isinstance(x, str) for x in obj.values()):
+        obj = {DEFAULT_CLASS: {DEFAULT_RULE_SET: obj}}
+    for substance_class, rule_sets in obj.items():
+        if not isinstance(rule_sets, dict):
+            raise ConfigError("Rule sets of \"{}\" must be a mapping".format(substance_class))
+        for name, rules in rule_sets.items():
+            if not isinstance(rules, dict) or not all(isinstance(x, str) for x in rules.values()):
+                raise ConfigError("Rule set \"{}.{}\" must map rule names to template strings"
+                                  .format(substance_class, name))
+    return obj
+
+
+class RuleConfig(object):
+    """ Rule sets loaded from a configuration file.
+    """
+    def __init__(self, rule_sets, digest=None):
+        """
+        :rule_sets: {substance class: {rule set name: rules}}
+        :digest: SHA-256 of the file content
+        """
+        self.rule_sets = rule_sets
+        self.digest = digest
+
+    def rules(self, substance_class=DEFAULT_CLASS, name=DEFAULT_RULE_SET):
+        """ Return rules dictionary of a rule set.
+        """
+        try:
+            return self.rule_sets[substance_class][name]
+        except KeyError:
+            raise ConfigError("Rule set \"{}.{}\" not found".format(substance_class, name))
+
+    def templates(self, substance_class=DEFAULT_CLASS, name=DEFAULT_RULE_SET):
+        return Templates(self.rules(substance_class, name))
+
+    def names(self):
+        """ Return list of (substance class, rule set name).
+        """
+        return [(c, n) for c, sets in sorted(self.rule_sets.items()) for n in sorted(sets)]
+
+
+def load_config(path, cache_dir=None):
+    """ Load configuration file and compile its templates.
+    :cache_dir: directory of the on-disk cache of parsed templates, or None
+    """
+    with open(path, 'rb') as src:
+        data = src.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, "{}.pickle".format(digest))
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            rule_sets, nodes = cached
+            for template_str, template_nodes in nodes.items():
+                compile_template(template_str, template_nodes)
+            return RuleConfig(rule_sets, digest)
+
+    rule_sets = normalize_rule_sets(parse_config_text(data, config_format(path)))
+    nodes = {}
+    for rule_sets_of_class in rule_sets.values():
+        for rules in rule_sets_of_class.values():
+            for template_str in rules.values():
+                if template_str not in nodes:
+                    nodes[template_str] = parse(template_str)
+                    compile_template(template_str, nodes[template_str])
+    if cache_path is not None:
+        _write_cache(cache_path, (rule_sets, nodes))
+    return RuleConfig(rule_sets, digest)
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as src:
+            version, payload = pickle.load(src)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError, ImportError):
+        return None
+    return payload if version == CACHE_VERSION else None
+
+
+def _write_cache(cache_path, payload):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    with open(tmp_path, 'wb') as out:
+        pickle.dump((CACHE_VERSION, payload), out, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+class ConfigFile(object):
+    """ Configuration file that is reloaded when it changes on disk.
+    """
+    def __init__(self, path, cache_dir=None, interval=1.0):
+        """
+        :interval: minimum number of seconds between file checks
+        """
+        self.path = path
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.config = None
+        self.error = None
+        self.listeners = []
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.check()
+
+    def check(self):
+        """ Reload the file if it has changed.
+            Return True if a new configuration was loaded. A file that fails
+            to load keeps the previous configuration and sets self.error;
+            the first load raises.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return False
+            try:
+                config = load_config(self.path, self.cache_dir)
+            except Exception as e:
+                if self.config is None:
+                    raise
+                self.error = e
+                self._stamp = stamp
+                return False
+            self.config = config
+            self.error = None
+            self._stamp = stamp
+        for listener in self.listeners:
+            listener(config)
+        return True
+
+    def current(self):
+        """ Return current configuration, checking the file at most
+            once per interval.
+        """
+        if time.monotonic() - self._checked >= self.interval:
+            try:
+                self.check()
+            except OSError:
+                pass
+        return self.config
+
+    def rules(self, substance_class=DEFAULT_CLASS, name=DEFAULT_RULE_SET):
+        return self.current().rules(substance_class, name)
+
+    def templates(self, substance_class=DEFAULT_CLASS, name=DEFAULT_RULE_SET):
+        return self.current().templates(substance_class, name)
+
+    def watch(self, callback=None):
+        """ Check the file every interval seconds in a background thread.
+        :callback: called with the new RuleConfig after every reload
+        """
+        if callback is not None:
+            self.listeners.append(callback)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
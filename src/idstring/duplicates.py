@@ -0,0 +1,177 @@
+""" Duplicate substance index.
+
+    Documents describing the same substance render the same identifier.
+    The index stores, per document, the SHA-256 digest of the identifier
+    and of each section of it (chains, polymers, substitutions,
+    attachments) in an SQLite database. Entities are sorted and named
+    canonically before rendering, so equal digests mean equal content.
+
+    Lookups of documents with the same identifier, or with the same chains
+    and different modifications, are single indexed queries.
+
+    with DuplicateIndex("substances.db", Rules) as index:
+        index.add_many(index_record(x) for x in run_batch(paths, templates, details=True) if x.ok)
+        index.duplicates()
+"""
+import hashlib
+import sqlite3
+
+from idstring.cache import rules_fingerprint
+
+
+SECTIONS = ("chains", "polymers", "substitutions", "attachments")
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DuplicateIndexError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class IndexRecord(object):
+    """ Digests of one document.
+    """
+    __slots__ = ("path", "identifier", "sections")
+
+    def __init__(self, path, identifier, sections):
+        """
+        :identifier: identifier digest
+        :sections: {section name: digest}; sections that were not rendered are None
+        """
+        self.path = path
+        self.identifier = identifier
+        self.sections = sections
+
+
+def index_record(result):
+    """ Return IndexRecord of a BatchResult made with details.
+    """
+    if result.fragments is None:
+        raise ValueError("{}: result has no fragments, process sources with details".format(result.path))
+    sections = {}
+    for name in SECTIONS:
+        items = result.fragments.get(name)
+        sections[name] = text_digest(";".join(items)) if items is not None else None
+    return IndexRecord(result.path, text_digest(result.identifier), sections)
+
+
+class DuplicateIndex(object):
+    """ On-disk index of identifier and section digests.
+    """
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS documents ("
+        " path TEXT PRIMARY KEY, identifier TEXT, {})".format(", ".join("{} TEXT".format(x) for x in SECTIONS)),
+        "CREATE INDEX IF NOT EXISTS documents_identifier ON documents (identifier)",
+        "CREATE INDEX IF NOT EXISTS documents_chains ON documents (chains)",
+    ]
+
+    def __init__(self, path, rules, reset=False):
+        """
+        :path: database file path
+        :rules: rules dictionary the identifiers are rendered with; digests
+                made with other rules cannot be compared
+        :reset: discard an index built with other rules instead of
+                raising DuplicateIndexError
+        """
+        self.path = path
+        self.fingerprint = rules_fingerprint(rules)
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            self._db.execute(statement)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is not None and row[0] != self.fingerprint and not reset:
+            self._db.close()
+            raise DuplicateIndexError("{} was built with other rules".format(path))
+        if row is None or row[0] != self.fingerprint:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute("DELETE FROM documents")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        """ Store records in a single transaction.
+            Return number of records stored.
+        """
+        rows = ((x.path, x.identifier) + tuple(x.sections.get(name) for name in SECTIONS) for x in records)
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            cursor = self._db.executemany("INSERT OR REPLACE INTO documents VALUES ({})"
+                                          .format(", ".join("?" * (2 + len(SECTIONS)))),
+                                          rows)
+        return cursor.rowcount
+
+    def index_results(self, results, batch_size=1000):
+        """ Store records of successful results in batches while passing
+            results through.
+        :results: iterable of BatchResult made with details
+        """
+        pending = []
+        for result in results:
+            if result.ok:
+                pending.append(index_record(result))
+                if len(pending) >= batch_size:
+                    self.add_many(pending)
+                    pending = []
+            yield result
+        if pending:
+            self.add_many(pending)
+
+    def same_identifier(self, record):
+        """ Return paths of other documents with the same identifier.
+        """
+        rows = self._db.execute("SELECT path FROM documents WHERE identifier = ? AND path != ? ORDER BY path",
+                                (record.identifier, record.path))
+        return [x[0] for x in rows]
+
+    def same_chains(self, record):
+        """ Return paths of documents with the same chains and a different
+            identifier, e.g. other modifications of the same protein.
+        """
+        rows = self._db.execute("SELECT path FROM documents WHERE chains = ? AND identifier != ? ORDER BY path",
+                                (record.sections["chains"], record.identifier))
+        return [x[0] for x in rows]
+
+    def get(self, path):
+        """ Return stored IndexRecord of a document or None.
+        """
+        row = self._db.execute("SELECT * FROM documents WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        return IndexRecord(row[0], row[1], dict(zip(SECTIONS, row[2:])))
+
+    def duplicates(self):
+        """ Yield lists of paths of documents that share an identifier.
+        """
+        rows = self._db.execute("SELECT identifier, path FROM documents WHERE identifier IN "
+                                "(SELECT identifier FROM documents GROUP BY identifier HAVING COUNT(*) > 1) "
+                                "ORDER BY identifier, path")
+        group = []
+        current = None
+        for identifier, path in rows:
+            if identifier != current and group:
+                yield group
+                group = []
+            current = identifier
+            group.append(path)
+        if group:
+            yield group
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
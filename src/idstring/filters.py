@@ -0,0 +1,111 @@
+""" Template variable filters.
+
+    A filter transforms a variable's value before it is emitted:
+    {{ chains|sort|join:";" }}. Filters receive the value and the
+    filter parameters and return the new value. List variables reach
+    the first filter as a lazy iterator over the rendered items, so
+    chained filters that do not need the whole sequence (unique, upper,
+    join, hash, ...) are evaluated in a single pass.
+"""
+import hashlib
+
+from idstring.sequence import SEQUENCES
+
+
+FILTERS = {}
+
+
+def is_sequence(value):
+    """ Return True if value is a sequence of items rather than a scalar.
+    """
+    return not isinstance(value, (str, int)) and hasattr(value, "__iter__")
+
+
+def builtin(name):
+    """ Decorator that adds a built-in filter to FILTERS.
+    """
+    def decorator(func):
+        FILTERS[name] = func
+        return func
+    return decorator
+
+
+@builtin("sort")
+def sort_filter(value):
+    """ Sort items.
+    """
+    return sorted(value) if is_sequence(value) else value
+
+
+@builtin("join")
+def join_filter(value, separator=";"):
+    """ Join items with separator.
+    """
+    return separator.join(value) if is_sequence(value) else value
+
+
+@builtin("unique")
+def unique_filter(value):
+    """ Drop repeated items, keeping the first occurrence.
+    """
+    if not is_sequence(value):
+        return value
+
+    def unique(items):
+        seen = set()
+        for item in items:
+            if item not in seen:
+                seen.add(item)
+                yield item
+    return unique(value)
+
+
+@builtin("count")
+def count_filter(value):
+    """ Return number of items; a scalar counts as one item.
+    """
+    if is_sequence(value):
+        return sum(1 for _ in value)
+    return 1
+
+
+@builtin("first")
+def first_filter(value):
+    """ Return first item or an empty string.
+    """
+    return next(iter(value), "") if is_sequence(value) else value
+
+
+@builtin("upper")
+def upper_filter(value):
+    """ Convert text to upper case.
+    """
+    if is_sequence(value):
+        return (x.upper() for x in value)
+    return str(value).upper()
+
+
+@builtin("digest")
+def digest_filter(value):
+    """ Replace sequence text with its SHA-256 digest; interned
+        chain sequences reuse their precomputed digest.
+    """
+    if is_sequence(value):
+        return (SEQUENCES.digest(x) for x in value)
+    return SEQUENCES.digest(str(value))
+
+
+@builtin("hash")
+def hash_filter(value, algorithm="sha256"):
+    """ Return hex digest of the text; items are hashed as if joined with ";".
+    """
+    digest = hashlib.new(algorithm)
+    if is_sequence(value):
+        separator = b""
+        for item in value:
+            digest.update(separator)
+            digest.update(str(item).encode("utf-8"))
+            separator = b";"
+    else:
+        digest.update(str(value).encode("utf-8"))
+    return digest.hexdigest()
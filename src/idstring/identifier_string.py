@@ -79,11 +79,15 @@
                 ```
 """
 
+import collections
+import re
 import sys
 
 
+from idstring.filters import FILTERS, is_sequence
 from idstring.spl import SplDocument
 from idstring.model import SplModelProtein
+from idstring.stats import observer
 
 
 class IdentifierStringTemplate(object):
@@ -149,8 +153,35 @@ class IdentifierStringTemplate(object):
     def to_string(self, template_str):
         """ Make identifier string using specified template.
         """
-        gen = TextGenerator(template_str)
-        return gen.to_string(self.context)
+        with observer().stage("render"):
+            return compile_template(template_str).render(self.context)
+
+    def write(self, template_str, write, chunk_size=65536):
+        """ Stream identifier string made with specified template.
+        :write: function called with consecutive chunks of the text,
+                e.g. the write method of a text file
+        :chunk_size: approximate number of characters per chunk
+        """
+        with observer().stage("render"):
+            sink = ChunkSink(write, chunk_size)
+            compile_template(template_str).render_into(self.context, sink)
+            sink.flush()
+
+
+def generate_identifier(source, templates, template_name="protein_identifier", document_class=SplDocument):
+    """ Return identifier string of an SPL document.
+    :source: SPL XML document file path
+    :templates: Templates object
+    :template_name: name of the top-level rule to render
+    :document_class: callable that makes an SplDocument from the source,
+                    e.g. SplDocument, a subclass or SplDocument.from_mmap
+    """
+    observer().count("documents")
+    template_str = templates.rules[template_name]
+    identifier = IdentifierStringTemplate(templates)
+    model = SplModelProtein(document_class(source))
+    model.accept(identifier, compile_template(template_str).variable_names)
+    return identifier.to_string(template_str)
 
 
 class TextGenerator(object):
@@ -162,19 +193,229 @@ class TextGenerator(object):
         """
         :template_str: text to emit. Variables in the text defined as {{ varname }}.
         """
-        self.nodes = parse(template_str)
-        
+        self.template_str = template_str
+        compile_template(template_str)  # fail early on template errors
+
+    @property
+    def compiled(self):
+        """ Return current compiled template; looked up on every use so
+            that templates compiled before register_filter bind the new filter.
+        """
+        return compile_template(self.template_str)
+
+    @property
+    def nodes(self):
+        return self.compiled.nodes
+
     def to_string(self, context):
         """
         :context: dictionary with named variables
         """
-        return ''.join([x.to_string(context) for x in self.nodes])
+        return self.compiled.render(context)
 
     def variable_names(self):
         """ Return collection of variable names.
         """
-        return [x.variable.name for x in self.nodes 
-                if isinstance(x, TextGeneratorElementVariable)]
+        return list(self.compiled.variable_names)
+
+
+class CompiledTemplate(object):
+    """ Template string compiled into a flat list of opcodes.
+        Each opcode is a pair (OP_TEXT, text), (OP_VARIABLE, name) or
+        (OP_FILTERED, (name, filters)) where filters are bound filter
+        functions; rendering walks the list once without touching
+        the parser or the filter registry.
+    """
+    OP_TEXT = 0
+    OP_VARIABLE = 1
+    OP_FILTERED = 2
+
+    def __init__(self, template_str, nodes=None):
+        """
+        :template_str: text to emit. Variables in the text defined as {{ varname }}.
+        :nodes: result of parse(template_str) if already known
+        """
+        self.template_str = template_str
+        self.nodes = nodes if nodes is not None else parse(template_str)
+        self.opcodes = []
+        names = []
+        for node in self.nodes:
+            if isinstance(node, TextGeneratorElementVariable):
+                variable = node.variable
+                names.append(variable.name)
+                if variable.transforms:
+                    self.opcodes.append((self.OP_FILTERED,
+                                         (variable.name, bind_filters(variable.transforms))))
+                else:
+                    self.opcodes.append((self.OP_VARIABLE, variable.name))
+            elif node.value:
+                self.opcodes.append((self.OP_TEXT, node.value))
+        self.variable_names = tuple(names)
+
+    def render(self, context):
+        """ Return text with variables substituted by values from the context.
+        :context: dictionary with named variables
+        """
+        out = []
+        self.render_into(context, out)
+        return ''.join(out)
+
+    def render_into(self, context, out):
+        """ Append text with variables substituted by values from the context to out.
+            Nested templates in the context append to the same sink, so no
+            intermediate strings are made for them.
+        :context: dictionary with named variables
+        :out: list or other object with an append method
+        """
+        obs = observer()
+        if obs.enabled:
+            obs.count("template_renders")
+        for op, arg in self.opcodes:
+            if op == self.OP_TEXT:
+                out.append(arg)
+            elif op == self.OP_VARIABLE:
+                write_variable(arg, context, out)
+            else:
+                out.append(render_variable(arg[0], context, arg[1]))
+
+
+class ChunkSink(object):
+    """ Render sink that passes text on in chunks.
+    """
+    def __init__(self, write, chunk_size=65536):
+        """
+        :write: function called with every chunk
+        :chunk_size: approximate number of characters per chunk
+        """
+        self._write = write
+        self.chunk_size = chunk_size
+        self._parts = []
+        self._size = 0
+
+    def append(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self._write(''.join(self._parts))
+            self._parts = []
+            self._size = 0
+
+
+# Compiled templates by template text, least recently used first.
+MAX_COMPILED_TEMPLATES = 1024
+_compiled_templates = collections.OrderedDict()
+
+
+def compile_template(template_str, nodes=None):
+    """ Return compiled form of the template string.
+        Compiled templates are cached by template text, so each
+        distinct template is parsed once per process; the cache keeps
+        the MAX_COMPILED_TEMPLATES most recently used templates.
+    :nodes: result of parse(template_str) if already known
+    """
+    try:
+        compiled = _compiled_templates[template_str]
+        _compiled_templates.move_to_end(template_str)
+        return compiled
+    except KeyError:
+        compiled = CompiledTemplate(template_str, nodes)
+        _compiled_templates[template_str] = compiled
+        while len(_compiled_templates) > MAX_COMPILED_TEMPLATES:
+            _compiled_templates.popitem(last=False)
+        return compiled
+
+
+def register_filter(name, func):
+    """ Register template filter.
+        func is called with the variable value followed by the filter
+        parameters and returns the new value.
+        Compiled templates are discarded so that they bind the new filter,
+        including those of existing Templates objects.
+    """
+    FILTERS[name] = func
+    _compiled_templates.clear()
+
+
+def bind_filters(transforms):
+    """ Return tuple of (filter function, parameters) for variable transforms.
+    """
+    bound = []
+    for transform in transforms:
+        try:
+            func = FILTERS[transform.func_name]
+        except KeyError:
+            raise TemplateParserError("Unknown filter \"{}\"".format(transform.func_name))
+        bound.append((func, tuple(transform.params)))
+    return tuple(bound)
+
+
+def render_variable(name, context, filters=()):
+    """ Return text representation of the named context variable.
+    :filters: bound filters applied to the value in order
+    """
+    try:
+        item = context[name]
+    except KeyError:
+        return "{{ {} }}".format(name)
+
+    if filters:
+        if isinstance(item, (list, tuple)):
+            value = (x if isinstance(x, str) else x.to_string() for x in item)
+        elif isinstance(item, (str, int)):
+            value = item
+        else:
+            value = item.to_string()
+        for func, params in filters:
+            value = func(value, *params)
+        if is_sequence(value):
+            return ";".join(value)
+        return str(value)
+
+    if isinstance(item, str):
+        return item
+    out = []
+    write_variable(name, context, out)
+    return ''.join(out)
+
+
+def write_variable(name, context, out):
+    """ Append text representation of the named context variable to out.
+        List items are separated by ";".
+    """
+    try:
+        item = context[name]
+    except KeyError:
+        out.append("{{ {} }}".format(name))
+        return
+
+    if isinstance(item, str):
+        out.append(item)
+    elif isinstance(item, int):
+        out.append(str(item))
+    elif isinstance(item, list):
+        first = True
+        for x in item:
+            if not first:
+                out.append(";")
+            first = False
+            write_item(x, out)
+    else:
+        write_item(item, out)
+
+
+def write_item(item, out):
+    """ Append text of a template instance or model value to out.
+    """
+    if isinstance(item, str):
+        out.append(item)
+    elif isinstance(item, StringTemplate):
+        item.render_into(out)
+    else:
+        out.append(item.to_string())
 
 
 class TextGeneratorElementString(object):
@@ -192,20 +433,29 @@ class TextGeneratorElementVariable(object):
     def to_string(self, context):
         """
         """
-        try:
-            item = context[self.variable.name]
-        except KeyError:
-            return "{{ {} }}".format(self.variable.name)
-        
-        if isinstance(item, str):
-            return item
-        elif isinstance(item, int):
-            return str(item)
-        elif isinstance(item, list):
-            coll = [x.to_string() for x in item]
-            return ";".join(coll)
-        else:
-            return item.to_string()
+        return render_variable(self.variable.name, context, bind_filters(self.variable.transforms))
+
+
+class Variable(object):
+    """ Template variable: name(|transform)*
+    """
+    def __init__(self, name, transforms):
+        self.name = name
+        self.transforms = transforms
+
+
+class Transform(object):
+    """ Variable transformation: func_name(:parameter(,parameter)*)?
+    """
+    def __init__(self, func_name, params):
+        self.func_name = func_name
+        self.params = params
+
+
+VARIABLE_START = "{{ "
+VARIABLE_END = " }}"
+NAME_RE = re.compile(r'[^\s|:,"{}]+')
+PARAMETER_RE = re.compile(r'"([^"]*)"|([^\s|,"{}]+)')
 
 
 def parse(input_str):
@@ -214,111 +464,63 @@ def parse(input_str):
         Elements could be of two types:
         - TextGeneratorElementString
         - TextGeneratorElementVariable
-    """
-    class Variable(object):
-        def __init__(self, name, transforms):
-            self.name = name
-            self.transforms = transforms
-
-    class Transform(object):
-        def __init__(self, func_name, params):
-            self.func_name = func_name
-            self.params = params
 
+        The template is scanned once from left to right; every token
+        is matched in place at its offset, so parsing is linear
+        in the template length.
+    """
     N = len(input_str)
 
     def parse_variable(offset):
-        """ Parse variable: "{{ " <variable> " }}"
-        """
-        offset = match_pattern("{{ ", offset)
-        offset, var = match_variable(offset)
-        offset = match_pattern(" }}", offset)
-        return offset, var
-
-    def match_pattern(pattern, offset):
-        """ Match specified pattern and advance
-            position within input buffer.
+        """ Parse variable: "{{ " name(|transform)* " }}".
+            offset points past the opening "{{ ".
         """
-        n = len(pattern)
-        if offset + n <= N:
-            if pattern == input_str[offset: offset + n]:
-                return offset + n
-        raise TemplateParserError('Failed to match pattern \"{}\" at {}'.format(pattern, offset))
-
-    def match_variable(offset):
-        """ Match variable pattern and 
-            retrun Variable object.
-            Variable pattern: name(|transform)*
-        """
-        offset, var_name = match_name(offset)
+        offset, name = match_token(NAME_RE, offset, "variable name")
         transforms = []
-        while input_str[offset] == '|':
-            offset, transform = match_transformation(offset + 1)
+        while input_str.startswith('|', offset):
+            offset, transform = parse_transform(offset + 1)
             transforms.append(transform)
-        return offset, Variable(var_name, transforms)
-
-    def match_transformation(offset):
-        """ Match transformation pattern.
-            Return transformation: function name, parameters.
+        if not input_str.startswith(VARIABLE_END, offset):
+            raise TemplateParserError('Failed to match pattern \"{}\" at {}'.format(VARIABLE_END, offset),
+                                      offset)
+        return offset + len(VARIABLE_END), Variable(name, transforms)
 
-            Transformation pattern: "|func_name(:parameter(,parameter)*)?
+    def parse_transform(offset):
+        """ Parse transformation: func_name(:parameter(,parameter)*)?
         """
-        offset, func_name = match_name(offset)
+        offset, func_name = match_token(NAME_RE, offset, "transform name")
         params = []
-        if input_str[offset] == ':':
-            offset, param = match_parameter(offset)
+        if input_str.startswith(':', offset):
+            offset, param = match_parameter(offset + 1)
             params.append(param)
-            while input_str[offset] == ',':
-                offset, param = match_parameter(offset+1)
+            while input_str.startswith(',', offset):
+                offset, param = match_parameter(offset + 1)
                 params.append(param)
         return offset, Transform(func_name, params)
 
-    def match_name(offset):
-        """ Return name token.
-            Name token is a sequence of characters up to 
-            a first occurrence of characters '|' or ' '.
-        """
-        text = []
-        while offset < N:
-            c = input_str[offset]
-            if c == '|' or c == ' ':
-                break
-            text.append(c)
-            offset += 1
-        return offset, ''.join(text)
+    def match_token(pattern, offset, what):
+        m = pattern.match(input_str, offset)
+        if m is None:
+            raise TemplateParserError("Expected {} at {}".format(what, offset), offset)
+        return m.end(), m.group(0)
 
     def match_parameter(offset):
-        """ Return parameter value
-        """
-        text = []
-        quoted = False
-
-        while offset < N:
-            c = input_str[offset]
-            if c == '"':
-                if quoted:
-                    offset += 1
-                    break
-                elif not text:
-                    quoted = True
-                    offset += 1
-            elif c == '|' or c == ' ' or c == ',':
-                if not quoted:
-                    break
-                text.append(c)
-                offset += 1
-            else:
-                text.append(c)
-                offset += 1
-        return offset, ''.join(text)
+        """ Return parameter value: quoted string or a token
+            up to one of characters '|', ',' or ' '.
+        """
+        m = PARAMETER_RE.match(input_str, offset)
+        if m is None:
+            raise TemplateParserError("Expected parameter at {}".format(offset), offset)
+        value = m.group(1) if m.group(1) is not None else m.group(2)
+        return m.end(), value
 
     pos = 0
     nodes = []
     while pos < N:
-        offset = input_str[pos: ].find("{{ ")
+        offset = input_str.find(VARIABLE_START, pos)
         if offset != -1:
-            nodes.append(TextGeneratorElementString(input_str[pos: pos+offset]))
-            pos, variable = parse_variable(pos+offset)
+            nodes.append(TextGeneratorElementString(input_str[pos: offset]))
+            pos, variable = parse_variable(offset + len(VARIABLE_START))
             nodes.append(TextGeneratorElementVariable(variable))
         else:
             nodes.append(TextGeneratorElementString(input_str[pos:]))
@@ -327,8 +529,9 @@ def parse(input_str):
 
 
 class TemplateParserError(Exception):
-    def __init__(self, message):
+    def __init__(self, message, offset=None):
         super().__init__(message)
+        self.offset = offset
 
 
 class Templates(object):
@@ -348,9 +551,9 @@ class StringTemplate(object):
     """
     """
     def __init__(self, template, generator):
-        self.attributes = generator.variable_names()
+        self.attributes = generator.compiled.variable_names
         self.string_template = template
-        self.generaor = generator
+        self.generator = generator
         self._context = {}
 
     def load(self, target):
@@ -373,8 +576,12 @@ class StringTemplate(object):
             Use context to replace template's variables with
             concrete values.
         """
-        gen = TextGenerator(self.string_template)
-        return gen.to_string(self._context)
+        return self.generator.compiled.render(self._context)
+
+    def render_into(self, out):
+        """ Append generated text to out.
+        """
+        self.generator.compiled.render_into(self._context, out)
 
 
 Rules = {
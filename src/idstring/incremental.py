@@ -0,0 +1,134 @@
+""" Incremental identifier generation for new versions of a document.
+
+    Each chain and irregular amino acid substance subtree is
+    fingerprinted by a digest of its serialized XML. Model data of subtrees
+    that did not change since the previous version is reused, and so are
+    rendered fragments of the chain, polymer, substitution and attachment
+    templates whose attribute values did not change. Bonds are always read
+    again; a BondIndex pass is cheaper than fingerprinting them.
+
+    Entities are still sorted and renamed (chain0, poly0, sub0, ...) over
+    the whole document, so the identifier is the same as a full rebuild.
+
+    state = IncrementalState.load("protein.state")
+    identifier = generate_identifier("protein-v2.xml", Templates(Rules), state)
+    state.save("protein.state")
+"""
+import os
+import pickle
+
+from idstring.identifier_string import IdentifierStringTemplate, StringTemplate, compile_template
+from idstring.model import MoietyMemo, SplModelProtein
+from idstring.spl import SplDocument
+from idstring.stats import observer
+
+
+STATE_VERSION = 2
+
+
+class IncrementalState(object):
+    """ Model data and rendered fragments of the last processed version.
+    """
+    def __init__(self, entities=None, fragments=None):
+        """
+        :entities: MoietyMemo table of the previous version
+        :fragments: rendered fragments of the previous version
+        """
+        self.entities = entities if entities is not None else {}
+        self.fragments = fragments if fragments is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """ Return state saved at path; empty state if there is none.
+        """
+        try:
+            with open(path, 'rb') as src:
+                version, entities, fragments = pickle.load(src)
+        except FileNotFoundError:
+            return cls()
+        if version != STATE_VERSION:
+            return cls()
+        return cls(entities, fragments)
+
+    def save(self, path):
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, 'wb') as out:
+            pickle.dump((STATE_VERSION, self.entities, self.fragments), out,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+class Fragments(object):
+    """ Rendered fragments keyed by template and attribute values.
+    """
+    def __init__(self, previous):
+        self.previous = previous
+        self.current = {}
+        self.reused = 0
+
+    def render(self, template):
+        """ Return text of a StringTemplate, reusing the previous rendering.
+        """
+        context = template._context
+        key = (template.string_template, tuple(context.get(x) for x in template.attributes))
+        try:
+            text = self.previous[key]
+            self.reused += 1
+        except KeyError:
+            text = template.generator.compiled.render(context)
+        except TypeError:  # unhashable attribute value
+            return template.generator.compiled.render(context)
+        self.current[key] = text
+        return text
+
+
+class FragmentStringTemplate(StringTemplate):
+    """ StringTemplate rendered through a Fragments table.
+    """
+    def __init__(self, template, generator, fragments):
+        super().__init__(template, generator)
+        self._fragments = fragments
+
+    def to_string(self):
+        return self._fragments.render(self)
+
+    def render_into(self, out):
+        out.append(self._fragments.render(self))
+
+
+class FragmentTemplates(object):
+    """ Templates whose instances are rendered through a Fragments table.
+    """
+    def __init__(self, templates, fragments):
+        self.templates = templates
+        self.rules = templates.rules
+        self.fragments = fragments
+
+    def make_instance_of(self, name):
+        template = self.rules[name]
+        return FragmentStringTemplate(template, self.templates.generators[template], self.fragments)
+
+
+def generate_identifier(source, templates, state, template_name="protein_identifier", document_class=SplDocument):
+    """ Return identifier string of an SPL document, reusing the state of
+        the previous version. state is updated to this version.
+    :source: SPL XML document file path
+    :templates: Templates object
+    :state: IncrementalState
+    :template_name: name of the top-level rule to render
+    :document_class: callable that makes an SplDocument from the source
+    """
+    obs = observer()
+    obs.count("documents")
+    template_str = templates.rules[template_name]
+    memo = MoietyMemo(state.entities)
+    fragments = Fragments(state.fragments)
+    identifier = IdentifierStringTemplate(FragmentTemplates(templates, fragments))
+    model = SplModelProtein(document_class(source), memo)
+    model.accept(identifier, compile_template(template_str).variable_names)
+    text = identifier.to_string(template_str)
+    obs.count("moieties_reused", memo.reused)
+    obs.count("fragments_reused", fragments.reused)
+    state.entities = memo.current
+    state.fragments = fragments.current
+    return text
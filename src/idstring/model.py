@@ -1,62 +1,157 @@
-from idstring.spl import SplDocument, SPLDocumentError
+import hashlib
+from operator import attrgetter
+
+from lxml import etree
+
+from idstring.sequence import SEQUENCES
+from idstring.spl import SplDocument, SPLDocumentError, register_xpath
+from idstring.stats import observer
 
 
 class SplModelProtein(object):
-    def __init__(self, xmldoc):
-        self.chains = Chains(xmldoc)
-        self.polymers = Polymers(xmldoc)
-        self.modifications = Modifications(xmldoc,
-                                           lambda x: self.chains[x],  # chain lookup by local id
-                                           lambda x: self.polymers[x] # irreg AA lookup by code
-                                           )
-
-    def accept(self, visitor):
+    """ Protein document model.
+        Chains, polymers and modifications are loaded from the document
+        on first access, so sections that are never visited cost nothing.
+    """
+    def __init__(self, xmldoc, memo=None):
+        """
+        :memo: MoietyMemo with entities of a previous document version
+        """
+        self.xmldoc = xmldoc
+        self.memo = memo if memo is not None else NO_MEMO
+        self._chains = None
+        self._polymers = None
+        self._modifications = None
+
+    @property
+    def chains(self):
+        if self._chains is None:
+            with observer().stage("model.chains"):
+                self._chains = Chains(self.xmldoc, memo=self.memo)
+        return self._chains
+
+    @property
+    def polymers(self):
+        if self._polymers is None:
+            with observer().stage("model.polymers"):
+                self._polymers = Polymers(self.xmldoc, memo=self.memo)
+        return self._polymers
+
+    @property
+    def modifications(self):
+        if self._modifications is None:
+            chains = self.chains
+            polymers = self.polymers
+            with observer().stage("model.modifications"):
+                self._modifications = Modifications(self.xmldoc,
+                                                    lambda x: chains[x],  # chain lookup by local id
+                                                    lambda x: polymers[x] # irreg AA lookup by code
+                                                    )
+        return self._modifications
+
+    def accept(self, visitor, names=None):
         """
         :visitor: Vistor object
+        :names: names of the sections to visit; all sections if None
         """
-        visitor.visit("chains", self.chains)
-        visitor.visit("polymers", self.polymers)
-        visitor.visit("substitutions", self.modifications.sub_points)
-        visitor.visit("attachments", self.modifications.attachments)
+        if names is None or "chains" in names:
+            visitor.visit("chains", self.chains)
+        if names is None or "polymers" in names:
+            visitor.visit("polymers", self.polymers)
+        if names is None or "substitutions" in names:
+            visitor.visit("substitutions", self.modifications.sub_points)
+        if names is None or "attachments" in names:
+            visitor.visit("attachments", self.modifications.attachments)
+
+
+class MoietyMemo(object):
+    """ Model data built from document subtrees, keyed by a digest of the
+        serialized subtree.
+        Data found in the previous document version is reused, the rest is
+        built; current holds what this version used and becomes the
+        previous table of the next version.
+    """
+    def __init__(self, previous=None):
+        """
+        :previous: current table of the memo of the previous version
+        """
+        self.previous = previous if previous is not None else {}
+        self.current = {}
+        self.reused = 0
+
+    def get(self, section, element, build):
+        """ Return data of a subtree.
+        :section: name of the model section, part of the key
+        :element: xml dom element
+        :build: function that makes the data from the element
+        """
+        key = (section, hashlib.sha256(etree.tostring(element, with_tail=False)).digest())
+        try:
+            value = self.previous[key]
+            self.reused += 1
+        except KeyError:
+            value = build(element)
+        self.current[key] = value
+        return value
+
+
+class NoMemo(object):
+    """ Memo that always builds.
+    """
+    def get(self, section, element, build):
+        return build(element)
+
+
+NO_MEMO = NoMemo()
 
 
 class Chains(object):
     """ SPL document protein chains.
     """
-    xpath_moiety = "./x:moiety[x:code[@code=\"C118424\"]]"
-    xpath_localid = "./x:partMoiety/x:id/@extension"
-    xpath_aa = "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-aa-seq\"]/text()"
+    xpath_moiety = register_xpath("chain-moiety", "./x:moiety[x:code[@code=\"C118424\"]]")
+    xpath_localid = register_xpath("chain-localid", "./x:partMoiety/x:id/@extension")
+    xpath_aa = register_xpath("chain-aa-seq", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-aa-seq\"]/text()")
 
-    def __init__(self, doc):
+    def __init__(self, doc, sequences=SEQUENCES, memo=NO_MEMO):
         """
+        :sequences: SequencePool used to intern chain sequences
+        :memo: MoietyMemo of chains of a previous document version
         """
         self._counter = 0
         self._pos = 0
         self.chains = []
-        self._load(doc)
+        self._sequences = sequences
+        self._load(doc, memo)
 
-    def _load(self, doc):
+    def _load(self, doc, memo):
         """ Load chains defined in the SPL XML document.
+            Chains are ordered by sequence length and digest, so long
+            sequences are never compared character by character.
         :doc: SPL XML DOM object
         """
         substance = doc.substance()
-        nodes = substance.xpath(self.xpath_moiety, namespaces=doc.NAMESPACES)
+        nodes = self.xpath_moiety(substance)
+        observer().count("moieties", len(nodes))
         for moiety in nodes:
-            local_id = moiety.xpath(self.xpath_localid, namespaces=doc.NAMESPACES)
-            if not local_id:
-                raise SPLDocumentError("local id not found")
-
-            value = moiety.xpath(self.xpath_aa, namespaces=doc.NAMESPACES)
-            if not value:
-                raise SPLDocumentError("Polypeptide chain AA sequence not found")
-            quantity = get_quantity(moiety)
-            self.chains.append(Chain(local_id[0], value[0], quantity))
-        self.chains = sorted(self.chains, key=lambda x: (x.value, x.local_id))
+            self.chains.append(memo.get("chains", moiety, self._make_chain))
+        self.chains = sorted(self.chains, key=sort_key)
         for index, chain in enumerate(self.chains):
             chain.name = "chain{}".format(self._counter)
             self._counter += 1
         self._lookup = {x.local_id: x for x in self.chains}
 
+    def _make_chain(self, moiety):
+        local_id = self.xpath_localid(moiety)
+        if not local_id:
+            raise SPLDocumentError("local id not found")
+
+        value = self.xpath_aa(moiety)
+        if not value:
+            raise SPLDocumentError("Polypeptide chain AA sequence not found")
+        quantity = get_quantity(moiety)
+        value, digest = self._sequences.intern(value[0])
+        return Chain(local_id[0], value, quantity, digest)
+
     def __getitem__(self, key):
         """ Return chain descriptor by local id
         """
@@ -76,34 +171,81 @@ class Chains(object):
 
 
 class Chain(object):
-    def __init__(self, local_id, value, quantity):
+    __slots__ = ("local_id", "value", "quantity", "name", "digest", "length", "sort_key", "_analysis")
+
+    def __init__(self, local_id, value, quantity, digest=None):
+        """
+        :digest: sequence digest; computed if not given
+        """
         self.local_id = local_id
         self.value = value
         self.quantity = quantity
         self.name = None
+        self.digest = digest if digest is not None else SEQUENCES.digest(value)
+        self.length = len(value)
+        self.sort_key = (self.length, self.digest, local_id)
+        self._analysis = None
+
+    @property
+    def analysis(self):
+        """ Return SequenceAnalysis of the chain sequence.
+        """
+        if self._analysis is None:
+            self._analysis = SEQUENCES.analyze(self.value)
+        return self._analysis
+
+    @property
+    def composition(self):
+        """ Return residue counts, e.g. "A12C4D7".
+        """
+        return self.analysis.composition
+
+    @property
+    def invalid_residues(self):
+        """ Return characters of the sequence that are not residue codes.
+        """
+        return self.analysis.invalid
+
+    def check_positions(self, positions):
+        """ Raise SPLDocumentError if a position is not on the chain.
+        """
+        if positions and (min(positions) < 1 or max(positions) > self.length):
+            bad = self.analysis.out_of_range(positions)
+            raise SPLDocumentError("Position {} outside chain \"{}\" of length {}"
+                                   .format(bad[0], self.local_id, self.length))
+
+    def residue(self, position):
+        """ Return residue at a position (1-based).
+        """
+        return self.analysis.residues([position])
 
 
 class Polymers(object):
     """ SPL document polymers / irregular AA.
     """
-    xpath_localid = "./x:code/@code"
+    xpath_localid = register_xpath("polymer-code", "./x:code/@code")
+    xpath_moiety_code = register_xpath("polymer-moiety-code", "./x:asSpecializedKind/x:generalizedMaterialKind/x:code/@code")
+    xpath_moiety = register_xpath("polymer-moiety", "./x:moiety[x:partMoiety/x:code[@code=$code]]")
+    xpath_connection_points = register_xpath("polymer-connection-points", "./x:moiety[x:code[@code=\"C118427\"]]")
+    xpath_positions = register_xpath("polymer-connection-positions", "./x:positionNumber[@value]/@value|./x:positionNumber[@nullFlavor]/@nullFlavor")
 
-    def __init__(self, doc):
+    def __init__(self, doc, memo=NO_MEMO):
         """
+        :memo: MoietyMemo of polymers of a previous document version
         """
         self._counter = 0
         self._pos = 0
         self.polymers = []
-        self._load(doc)
+        self._load(doc, memo)
 
-    def _load(self, doc):
+    def _load(self, doc, memo):
         """ Load polymers / irregular AA moleculs defined in the SPL XML document (other substance(s)).
         :doc: SPL XML DOM object
         """
 
         def read_code(subject):
             """ Return aux substance code"""
-            code = subject.xpath(self.xpath_localid, namespaces=doc.NAMESPACES)
+            code = self.xpath_localid(subject)
             if len(code) != 1:
                 raise SPLDocumentError("Aux substance code not found")
             return code[0]
@@ -111,12 +253,10 @@ class Polymers(object):
         def get_moiety(subject):
             """ Return moiety that represents subject's chemical structure.
             """
-            moiety_code = sub.xpath("./x:asSpecializedKind/x:generalizedMaterialKind/x:code/@code",
-                                    namespaces=doc.NAMESPACES)
+            moiety_code = self.xpath_moiety_code(subject)
             if len(moiety_code) != 1:
                 raise SPLDocumentError("Moiety code not found")
-            moiety = subject.xpath("./x:moiety[x:partMoiety/x:code[@code=\"{}\"]]".format(moiety_code[0]),
-                                   namespaces=doc.NAMESPACES)
+            moiety = self.xpath_moiety(subject, code=moiety_code[0])
             if len(moiety) != 1:
                 raise SPLDocumentError("Moiety \"{}\" not found".format(moiety_code[0]))
             return moiety[0]
@@ -124,32 +264,27 @@ class Polymers(object):
         def get_connection_points(subject):
             """
             """
-
-            class ConnectionPoint(object):
-                def __init__(self, amino_group, carboxyl_group):
-                    self.amino_group = amino_group
-                    self.carboxyl_group = carboxyl_group
-
-                def to_string(self):
-                    return "N{}C{}".format(self.amino_group, self.carboxyl_group)
-
             points = []
-            nodes = subject.xpath("./x:moiety[x:code[@code=\"C118427\"]]", namespaces=doc.NAMESPACES)
+            nodes = self.xpath_connection_points(subject)
             for node in nodes:
-                positions = node.xpath("./x:positionNumber[@value]/@value|./x:positionNumber[@nullFlavor]/@nullFlavor", namespaces=doc.NAMESPACES)
+                positions = self.xpath_positions(node)
                 points.append(ConnectionPoint(positions[0], positions[1]))
             return points
 
         subjects = doc.substance_other()
         if subjects is not None:
-            for sub in subjects:
+            observer().count("moieties", len(subjects))
+            def make_polymer(sub):
                 code = read_code(sub)
                 moiety = get_moiety(sub)
                 conn_points = get_connection_points(sub)
                 value = get_chem_structure(moiety, None)
                 quantity = get_quantity(moiety)
-                self.polymers.append(Polymer(code, value, conn_points, quantity))
-        self.polymers = sorted(self.polymers, key=lambda x: (x.value, x.code))
+                return Polymer(code, value, conn_points, quantity)
+
+            for sub in subjects:
+                self.polymers.append(memo.get("polymers", sub, make_polymer))
+        self.polymers = sorted(self.polymers, key=sort_key)
         self._lookup = {x.code: x for x in self.polymers}
         for index, x in enumerate(self.polymers):
             x.name = "poly{}".format(self._counter)
@@ -173,13 +308,27 @@ class Polymers(object):
             raise StopIteration()
 
 
+class ConnectionPoint(object):
+    __slots__ = ("amino_group", "carboxyl_group")
+
+    def __init__(self, amino_group, carboxyl_group):
+        self.amino_group = amino_group
+        self.carboxyl_group = carboxyl_group
+
+    def to_string(self):
+        return "N{}C{}".format(self.amino_group, self.carboxyl_group)
+
+
 class Polymer(object):
+    __slots__ = ("code", "value", "conn_points", "quantity", "name", "sort_key")
+
     def __init__(self, code, value, conn_points, quantity):
         self.code = code
         self.value = value
         self.conn_points = conn_points
         self.quantity = quantity
         self.name = None
+        self.sort_key = (value, code)
 
     @property
     def connection_points(self):
@@ -189,7 +338,6 @@ class Polymer(object):
 
 
 class Modifications(object):
-    xpath_moiety = "./x:moiety[x:code[@code=\"C118425\"]]/x:partMoiety"
 
     def __init__(self, doc, chain_lookup, polymer_lookup):
         """
@@ -199,66 +347,142 @@ class Modifications(object):
         self.substitutions = []
         self.attachments = []
         self._load(doc, chain_lookup, polymer_lookup)
-        self.substitutions = sorted(self.substitutions)
+        self.substitutions = sorted(self.substitutions, key=sort_key)
         for index, sub in enumerate(self.substitutions):
             sub.set_name("sub{}".format(index))
         self.sub_points = []
         for sub in self.substitutions:
             self.sub_points.extend(sub.points)
-        self.attachments = sorted(self.attachments)
+        self.attachments = sorted(self.attachments, key=sort_key)
 
     def _load(self, doc, chain_lookup, polymer_lookup):
-        substance = doc.substance()
-        nodes = substance.xpath(self.xpath_moiety, namespaces=doc.NAMESPACES)
-        for node in nodes:
-            code = node.xpath("./x:code/@code", namespaces=doc.NAMESPACES) # Moiety substance, irreg. AA code
-            if len(code) != 1:
-                raise SPLDocumentError("Moiety substance code not found")
-            code = code[0]
-            bonds = node.xpath("./x:bond[x:code[@code=\"C118426\"]]", namespaces=doc.NAMESPACES)  # AA substitutions
-            if bonds:
-                    sub = make_substitution_points(doc, bonds, 
-                                                       polymer_lookup(code),
-                                                       chain_lookup)
+        index = BondIndex(doc.substance())
+        obs = observer()
+        obs.count("moieties", len(index.moieties))
+        for code, sub_bonds, attach_bonds in index.moieties:
+            if sub_bonds:
+                    obs.count("bonds", len(sub_bonds))
+                    sub = make_substitution_points(sub_bonds,
+                                                   polymer_lookup(code),
+                                                   chain_lookup)
                     self.substitutions.append(sub)
 
-            bonds = node.xpath("./x:bond[x:code[@code=\"C14050\"]]", namespaces=doc.NAMESPACES)  # Attachments
-            if bonds:
-                for point in make_attachment_points(doc, code, bonds, chain_lookup):
+            if attach_bonds:
+                obs.count("bonds", len(attach_bonds))
+                for point in make_attachment_points(code, attach_bonds, chain_lookup):
                     self.attachments.append(point)
 
 
-def make_substitution_points(doc, bonds, irreg_aa, chain_lookup):
+NS = "{{{}}}".format(SplDocument.NAMESPACES["x"])
+TAG_MOIETY = NS + "moiety"
+TAG_PART_MOIETY = NS + "partMoiety"
+TAG_CODE = NS + "code"
+TAG_BOND = NS + "bond"
+TAG_POSITION = NS + "positionNumber"
+TAG_DISTAL_MOIETY = NS + "distalMoiety"
+TAG_ID = NS + "id"
+
+MODIFICATION_CODE = "C118425"
+SUBSTITUTION_BOND_CODE = "C118426"
+ATTACHMENT_BOND_CODE = "C14050"
+
+
+def child_codes(element):
+    """ Return code attributes of the element's code children.
     """
+    return [x.get("code") for x in element.iterchildren(TAG_CODE) if x.get("code") is not None]
+
+
+class BondIndex(object):
+    """ Bonds of the structural modifications of a substance, read in one
+        pass over the substance's children instead of XPath queries per
+        moiety and per bond.
+        Bonds are (distal moiety local id, positions) tuples, kept per part
+        moiety because each part moiety is one substitution.
+    """
+    def __init__(self, substance):
+        """
+        :substance: main substance element
+        """
+        self.moieties = []  # (moiety code, substitution bonds, attachment bonds) in document order
+        for moiety in substance.iterchildren(TAG_MOIETY):
+            if MODIFICATION_CODE not in child_codes(moiety):
+                continue
+            for part in moiety.iterchildren(TAG_PART_MOIETY):
+                self._add(part)
+
+    def _add(self, part):
+        code = child_codes(part)  # Moiety substance, irreg. AA code
+        if len(code) != 1:
+            raise SPLDocumentError("Moiety substance code not found")
+        code = code[0]
+        substitutions = []
+        attachments = []
+        for bond in part.iterchildren(TAG_BOND):
+            bond_codes = child_codes(bond)
+            if SUBSTITUTION_BOND_CODE in bond_codes:
+                substitutions.append(read_bond(bond))
+            if ATTACHMENT_BOND_CODE in bond_codes:
+                attachments.append(read_bond(bond))
+        self.moieties.append((code, tuple(substitutions), tuple(attachments)))
+
+
+def read_bond(bond):
+    """ Return (distal moiety local id, positions) of a bond element.
+    """
+    local_id = None
+    for distal in bond.iterchildren(TAG_DISTAL_MOIETY):
+        for node in distal.iterchildren(TAG_ID):
+            local_id = node.get("extension")
+            if local_id is not None:
+                break
+        if local_id is not None:
+            break
+    if local_id is None:
+        raise SPLDocumentError("Bond distal moiety id not found")
+    positions = tuple(int(x.get("value")) for x in bond.iterchildren(TAG_POSITION)
+                      if x.get("value") is not None)
+    return local_id, positions
+
+
+def make_substitution_points(bonds, irreg_aa, chain_lookup):
+    """
+    :bonds: (local id, positions) tuples of a BondIndex
     """
     points = []
-    for bond in bonds:
-        local_id = bond.xpath("./x:distalMoiety/x:id/@extension", namespaces=doc.NAMESPACES)[0]
+    for local_id, positions in bonds:
         chain = chain_lookup(local_id)
-        positions = bond.xpath("./x:positionNumber/@value", namespaces=doc.NAMESPACES)
         if len(positions) != 2:
             raise SPLDocumentError("Expecting two position per bond")
-        positions = list(map(int, positions))
+        chain.check_positions(positions[1:])
         points.append(SubstitutionPoint(irreg_aa, positions[0], chain, positions[1]))
     return Substitution(points)
 
 
-def make_attachment_points(doc, glycan_code, bonds, chain_lookup):
+def make_attachment_points(glycan_code, bonds, chain_lookup):
+    """
+    :bonds: (local id, positions) tuples of a BondIndex
+    """
     if len(bonds) != 1:
         raise SPLDocumentError("Expecting one amino acid substitution point element")
 
-    for bond in bonds:
-        local_id = bond.xpath("./x:distalMoiety/x:id/@extension", namespaces=doc.NAMESPACES)[0]
-        self.chain = chain_lookup(local_id)
-        positions = bond.xpath("./x:positionNumber/@value", namespaces=doc.NAMESPACES)
+    for local_id, positions in bonds:
+        chain = chain_lookup(local_id)
         if len(positions) != 1:
             raise SPLDocumentError("Expecting one attachment position")
-        yield AttachmentPoint(glycan_code, chain, int(positions[0]))
+        chain.check_positions(positions)
+        yield AttachmentPoint(glycan_code, chain, positions[0])
+
+
+sort_key = attrgetter("sort_key")
 
 
 class Substitution(object):
+    __slots__ = ("_points", "sort_key")
+
     def __init__(self, points):
-        self._points = sorted(points)
+        self._points = sorted(points, key=sort_key)
+        self.sort_key = tuple(x.sort_key for x in self._points)
 
     @property
     def points(self):
@@ -269,19 +493,18 @@ class Substitution(object):
             p.name = value
 
     def __lt__(self, other):
-        for lhs, rhs in zip(self._points, other._points):
-            if rhs < lhs:
-                return False
-        return True
+        return self.sort_key < other.sort_key
 
 
 class SubstitutionPoint(object):
+    __slots__ = ("_irreg_aa", "_connection_point", "_chain", "_position", "_name", "sort_key")
+
     def __init__(self, irreg_aa, cp_index, chain, chain_pos):
         self._irreg_aa = irreg_aa
         self._connection_point = cp_index
         self._chain = chain
         self._position = chain_pos # position on protein chain
-        self._value = None
+        self.sort_key = (irreg_aa.name, cp_index, chain.name, chain_pos)
 
     @property
     def chain(self):
@@ -291,6 +514,12 @@ class SubstitutionPoint(object):
     def position(self):
         return self._position
 
+    @property
+    def residue(self):
+        """ Return residue at the substituted chain position.
+        """
+        return self._chain.residue(self._position)
+
     @property
     def polymer(self):
         return self._irreg_aa.name
@@ -301,9 +530,7 @@ class SubstitutionPoint(object):
 
     @property
     def value(self):
-        if self._value is None:
-            self._value = "{}:{}:{}:{}".format(self.chain, self.position, self.polymer, self.connection_point)
-        return self._value
+        return "{}:{}:{}:{}".format(self.chain, self.position, self.polymer, self.connection_point)
 
     @property
     def name(self):
@@ -314,31 +541,17 @@ class SubstitutionPoint(object):
         self._name = value
 
     def __lt__(self, other):
-        if self.polymer < other.polymer:
-            return True
-        elif self.polymer > other.polymer:
-            return False
-        if self.connection_point < other.connection_point:
-            return True
-        elif self.connection_point > other.connection_point:
-            return False
-        if self.chain < other.chain:
-            return True
-        elif self.chain > other.chain:
-            return False
-        if self.position < other.position:
-            return True
-        elif self.position > other.position:
-            return False
-        return False
+        return self.sort_key < other.sort_key
 
    
 class AttachmentPoint(object):
+    __slots__ = ("_glycan_code", "_chain", "_position", "sort_key")
+
     def __init__(self, glycan_code, chain, chain_pos):
         self._glycan_code = glycan_code
         self._chain = chain
         self._position = chain_pos
-        self._value = None
+        self.sort_key = (glycan_code, chain.name, chain_pos)
 
     @property
     def chain(self):
@@ -348,54 +561,46 @@ class AttachmentPoint(object):
     def position(self):
         return self._position
 
+    @property
+    def residue(self):
+        """ Return residue at the attachment chain position.
+        """
+        return self._chain.residue(self._position)
+
     @property
     def glycan(self):
         return self._glycan_code
 
     @property
     def value(self):
-        if self._value is None:
-            self._value = "{}:{}:[}".format(self.chain, self.position, self.glycan)
-        return self._value
+        return "{}:{}:{}".format(self.chain, self.position, self.glycan)
 
     def __lt__(self, other):
-        if self.glycan < other.glycan:
-            return True
-        elif self.glycan > other.glycan:
-            return False
-        if self.chain < other.chain:
-            return True
-        elif self.chain > other.chain:
-            return False
-        if self.position < other.position:
-            return True
-        elif self.position > other.position:
-            return False
-        return False
+        return self.sort_key < other.sort_key
 
 
 CHEMICAL_STRUCT = [
     ("x-inchi-key",
-     "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-inchi-key\"]/text()"),
+     register_xpath("chem-x-inchi-key", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-inchi-key\"]/text()")),
     ("x-inchi",
-     "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-inchi\"]/text()"),
+     register_xpath("chem-x-inchi", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-inchi\"]/text()")),
     ("x-mdl-molfile",
-     "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-mdl-molfile\"]/text()"),
+     register_xpath("chem-x-mdl-molfile", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-mdl-molfile\"]/text()")),
     ("x-aa=seq",
-     "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-aa-seq\"]/text()"),
+     register_xpath("chem-x-aa-seq", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-aa-seq\"]/text()")),
     ("x-na-seq",
-     "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-na-seq\"]/text()"),
+     register_xpath("chem-x-na-seq", "./x:subjectOf/x:characteristic[x:code[@code=\"C103240\"]]/x:value[@mediaType=\"application/x-na-seq\"]/text()")),
 ]
 
 
-def get_chem_structure(moiety, mediaType, namespaces=SplDocument.NAMESPACES):
+def get_chem_structure(moiety, mediaType):
     """ Return chemical struct value.
         :moiety: xml dom element
         :mediaType: concrete mediaType or None if any
     """
 
     def get_value(query):
-        nodes = moiety.xpath(query, namespaces=namespaces)
+        nodes = query(moiety)
         if nodes:
             return nodes[0]
         else:
@@ -409,36 +614,48 @@ def get_chem_structure(moiety, mediaType, namespaces=SplDocument.NAMESPACES):
     return None
 
 
-def get_quantity(moiety, namespaces=SplDocument.NAMESPACES):
+xpath_numerator = register_xpath("quantity-numerator", "./x:quantity/x:numerator")
+xpath_denominator = register_xpath("quantity-denominator", "./x:quantity/x:denominator")
+xpath_low = register_xpath("quantity-low", "./x:low")
+xpath_high = register_xpath("quantity-high", "./x:high")
+
+
+class Quantity(object):
+    __slots__ = ("num", "denom", "unit")
+
+    def __init__(self, num, denom, unit):
+        self.num = num
+        self.denom = denom
+        self.unit = unit
+
+    def to_string(self):
+        return "{}:{}:{}".format(self.num, self.denom, self.unit)
+
+
+class QuantityRange(object):
+    __slots__ = ("low", "low_incl", "high", "high_incl", "denom", "unit")
+
+    def __init__(self, low, low_inclusive, high, high_inclusive, denom, unit):
+        self.low = low
+        self.low_incl = low_inclusive
+        self.high = high
+        self.high_incl = high_inclusive
+        self.denom = denom
+        self.unit = unit
+
+    def to_string(self):
+        return "{}{},{}{}:{}:{}".format("[" if self.low_incl else "(",
+                                        self.low,
+                                        self.high,
+                                        "]" if self.high_incl else ")",
+                                        self.denom,
+                                        self.unit)
+
+
+def get_quantity(moiety):
     """
     """
 
-    class Quantity(object):
-        def __init__(self, num, denom, unit):
-            self.num = num
-            self.denom = denom
-            self.unit = unit
-
-        def to_string(self):
-            return "{}:{}:{}".format(self.num, self.denom, self.unit)
-
-    class QuanityRange(object):
-        def __init__(self, low, low_inclusive, high, high_inclusive, denom, unit):
-            self.low = low
-            self.low_incl = low_inclusive
-            self.high = high
-            self.high_incl = high_inclusive
-            self.denom = denom
-            self.unit = unit
-
-        def to_string(self):
-            return "{}{},{}{}:{}:{}".format("[" if self.low_incl else "(",
-                                            self.low,
-                                            self.high,
-                                            "]" if self.high_incl else ")",
-                                            self.denom.
-                                            self.unit)
-
     def is_inclusive(el):
         rc = True
         if "inclusive" in el:
@@ -446,8 +663,8 @@ def get_quantity(moiety, namespaces=SplDocument.NAMESPACES):
                 rc = False
         return rc
 
-    numerator = moiety.xpath("./x:quantity/x:numerator", namespaces=namespaces)[0]
-    denominator = moiety.xpath("./x:quantity/x:denominator", namespaces=namespaces)[0]
+    numerator = xpath_numerator(moiety)[0]
+    denominator = xpath_denominator(moiety)[0]
 
     attributes = denominator.attrib
     unit = attributes["unit"]
@@ -458,8 +675,8 @@ def get_quantity(moiety, namespaces=SplDocument.NAMESPACES):
         num_value = attributes["value"]
         return Quantity(num_value, denom_value, unit)
     else:  # range
-        low = numerator.xapth("./x:low")[0]
-        high = numerator.xapth("./x:high")[0]
+        low = xpath_low(numerator)[0]
+        high = xpath_high(numerator)[0]
         return QuantityRange(low.attrib["value"],
                              is_inclusive(low),
                              high.attrib["value"],
@@ -0,0 +1,156 @@
+""" Amino acid sequences.
+
+    Chain sequences are interned in a SequencePool: identical sequences
+    share one string object and their digest is computed once, within
+    a document and across documents processed by the same process.
+
+    SequenceAnalysis encodes a sequence as bytes once and derives residue
+    composition, validity and residues at given positions with bulk byte
+    operations; NumPy is used for counting when it is installed.
+"""
+import collections
+import hashlib
+import string
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# IUPAC one-letter codes, including ambiguity (B, J, X, Z) and
+# non-standard (O, U) residues.
+RESIDUES = string.ascii_uppercase.encode("ascii")
+
+
+def sequence_digest(value):
+    """ Return SHA-256 hex digest of a sequence.
+    """
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class SequenceAnalysis(object):
+    """ Residue statistics of a sequence.
+    """
+    __slots__ = ("data", "length", "counts", "invalid")
+
+    def __init__(self, value):
+        """
+        :value: amino acid sequence
+        """
+        self.data = value.encode("latin-1", "replace")
+        self.length = len(self.data)
+        self.counts = residue_counts(self.data)
+        self.invalid = bytes(sorted(set(self.data.translate(None, RESIDUES)))).decode("latin-1")
+
+    @property
+    def valid(self):
+        return not self.invalid
+
+    @property
+    def composition(self):
+        """ Return residue counts as text, e.g. "A12C4D7", in residue order.
+        """
+        return "".join("{}{}".format(chr(code), n) for code, n in zip(RESIDUES, self.counts) if n)
+
+    def out_of_range(self, positions):
+        """ Return positions (1-based) that are not on the sequence.
+        """
+        if numpy is not None and len(positions) > 64:
+            index = numpy.asarray(positions)
+            return index[(index < 1) | (index > self.length)].tolist()
+        return [x for x in positions if not 1 <= x <= self.length]
+
+    def residues(self, positions):
+        """ Return residues at positions (1-based) as text.
+        """
+        if numpy is not None and len(positions) > 64:
+            data = numpy.frombuffer(self.data, dtype=numpy.uint8)
+            return data[numpy.asarray(positions) - 1].tobytes().decode("latin-1")
+        data = self.data
+        return "".join(chr(data[x - 1]) for x in positions)
+
+
+def residue_counts(data):
+    """ Return tuple of counts of every residue in RESIDUES.
+    :data: sequence bytes
+    """
+    if numpy is not None:
+        counts = numpy.bincount(numpy.frombuffer(data, dtype=numpy.uint8), minlength=256)
+        return tuple(int(counts[x]) for x in RESIDUES)
+    return tuple(data.count(x) for x in RESIDUES)
+
+
+class SequencePool(object):
+    """ Intern table of sequences, their digests and analyses.
+
+        The table is bounded by the characters it holds: a sequence counts
+        once for the string and once more for the bytes of its analysis.
+        Least recently used sequences are dropped first.
+    """
+    def __init__(self, max_chars=64 * 1024 * 1024):
+        """
+        :max_chars: number of characters kept
+        """
+        self.max_chars = max_chars
+        self.size = 0
+        self._entries = collections.OrderedDict()
+
+    def _lookup(self, value):
+        entry = self._entries.get(value)
+        if entry is not None:
+            self._entries.move_to_end(value)
+        return entry
+
+    def _store(self, entry, chars):
+        self._entries[entry[0]] = entry
+        self.size += chars
+        while self.size > self.max_chars and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= entry_size(evicted)
+
+    def intern(self, value):
+        """ Return (canonical sequence object, digest).
+        """
+        entry = self._lookup(value)
+        if entry is None:
+            entry = [value, sequence_digest(value), None]
+            self._store(entry, len(value))
+        return entry[0], entry[1]
+
+    def digest(self, value):
+        """ Return digest of a sequence without interning it.
+        """
+        entry = self._lookup(value)
+        if entry is None:
+            return sequence_digest(value)
+        return entry[1]
+
+    def analyze(self, value):
+        """ Return SequenceAnalysis of a sequence, computed once per sequence.
+        """
+        entry = self._lookup(value)
+        if entry is None:
+            entry = [value, sequence_digest(value), SequenceAnalysis(value)]
+            self._store(entry, 2 * len(value))
+        elif entry[2] is None:
+            entry[2] = SequenceAnalysis(value)
+            self._store(entry, len(value))
+        return entry[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+def entry_size(entry):
+    """ Return characters held by a SequencePool entry.
+    """
+    value, _, analysis = entry
+    return len(value) if analysis is None else 2 * len(value)
+
+
+SEQUENCES = SequencePool()
@@ -0,0 +1,300 @@
+""" Identifier server.
+
+    A long-running process that keeps templates and compiled XPath
+    expressions warm in a pool of worker processes and serves identifiers
+    over HTTP on localhost or on a Unix socket.
+
+    python -m idstring.server --port 8765 --jobs 4
+    curl --data-binary @protein.xml http://127.0.0.1:8765/identifier
+    curl -X POST "http://127.0.0.1:8765/identifier?path=/data/protein.xml"
+
+    Endpoints:
+    POST /identifier   document bytes in the body, or ?path= of a file readable
+                       by the server; optional ?template= rule name
+    GET  /health       liveness check
+    GET  /stats        request counters and timings
+    POST /reload       reload rules and restart the worker pool (also on SIGHUP,
+                       and on changes of --config when started with --watch)
+
+    Paths are opened with the server's permissions; bind the server to
+    localhost or a Unix socket only.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from idstring.batch import _init_worker, _worker, format_error, process_source
+from idstring.config import ConfigFile, DEFAULT_RULE_SET
+from idstring.identifier_string import Templates, Rules
+
+
+def _render(source, template_name):
+    """ Return (identifier, error) for a document path or document bytes.
+        Runs in a worker set up by the batch pool initializer.
+    """
+    result = process_source(source, _worker["templates"], template_name, **_worker["options"])
+    return result.identifier, result.error
+
+
+def worker_context():
+    """ Return multiprocessing context of worker pools.
+        Workers are not forked from the server process, so pools built by
+        a reload do not inherit the listening socket.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class IdentifierService(object):
+    """ Pool of worker processes with warm templates.
+    """
+    def __init__(self, load_rules=lambda: Rules, jobs=None):
+        """
+        :load_rules: callable that returns the rules dictionary;
+                     called again on every reload
+        :jobs: number of worker processes, one per CPU if None
+        """
+        self.load_rules = load_rules
+        self.jobs = jobs or os.cpu_count() or 1
+        self.started = time.time()
+        self.generation = 0
+        self.counters = Counter()
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._executor = None
+        self.rules = None
+        self.reload()
+
+    def reload(self):
+        """ Load rules and replace the worker pool.
+            Requests already submitted finish on the old pool.
+        """
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self):
+        rules = self.load_rules()
+        Templates(rules)  # fail early on template errors
+        executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=worker_context(),
+                                       initializer=_init_worker, initargs=(rules, {}, False))
+        for future in [executor.submit(_warm_up) for _ in range(self.jobs)]:
+            future.result()
+        with self._lock:
+            previous, self._executor = self._executor, executor
+            self.rules = rules
+            self.generation += 1
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def identify(self, source, template_name="protein_identifier"):
+        """ Return (identifier, error) for a document path or document bytes.
+            Raise RuntimeError if the service is closed and BrokenProcessPool
+            if a worker died; the pool is then rebuilt for later requests.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            executor = self._executor
+            if executor is None:
+                raise RuntimeError("IdentifierService is closed")
+            try:
+                future = executor.submit(_render, source, template_name)
+            except BrokenProcessPool:
+                future = None
+        try:
+            if future is None:
+                raise BrokenProcessPool("worker pool is broken")
+            identifier, error = future.result()
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.counters["documents"] += 1
+            if error is not None:
+                self.counters["errors"] += 1
+            self.seconds += elapsed
+        return identifier, error
+
+    def _replace_broken(self, executor):
+        """ Rebuild the pool unless another request already replaced it.
+        """
+        with self._reload_lock:
+            with self._lock:
+                if self._executor is not executor:
+                    return
+                self.counters["pool_restarts"] += 1
+            self._reload()
+
+    def stats(self):
+        with self._lock:
+            return {"uptime": time.time() - self.started,
+                    "jobs": self.jobs,
+                    "generation": self.generation,
+                    "counters": dict(self.counters),
+                    "seconds": self.seconds}
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+def config_loader(config, rule_set="protein.default"):
+    """ Return load_rules callable for IdentifierService that re-reads
+        a ConfigFile if it changed; a file that fails to load fails the reload.
+    :config: ConfigFile
+    :rule_set: CLASS.NAME of the rule set
+    """
+    substance_class, _, name = rule_set.partition(".")
+
+    def load_rules():
+        config.check()
+        if config.error is not None:
+            raise config.error
+        return config.config.rules(substance_class, name or DEFAULT_RULE_SET)
+    return load_rules
+
+
+class IdentifierRequestHandler(BaseHTTPRequestHandler):
+    server_version = "idstring/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif path == "/stats":
+            self.send_json(200, self.server.service.stats())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        service = self.server.service
+        if url.path == "/identifier":
+            template_name = query.get("template", ["protein_identifier"])[0]
+            source = query["path"][0] if "path" in query else body
+            if not source:
+                self.send_json(400, {"error": "document body or path parameter required"})
+                return
+            try:
+                identifier, error = service.identify(source, template_name)
+            except RuntimeError as e:  # closed service or broken worker pool
+                self.send_json(503, {"identifier": None, "error": format_error(e)})
+                return
+            self.send_json(200 if error is None else 422, {"identifier": identifier, "error": error})
+        elif url.path == "/reload":
+            try:
+                service.reload()
+            except Exception as e:
+                self.send_json(500, {"error": format_error(e)})
+                return
+            self.send_json(200, {"generation": service.generation})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def send_json(self, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(service, host="127.0.0.1", port=8765, socket_path=None, verbose=False):
+    """ Return HTTP server bound to host:port or to a Unix socket.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, IdentifierRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), IdentifierRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="idstring.server", description="Serve identifier strings over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="worker processes, 0 for one per CPU")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--config", help="rules configuration file (JSON, YAML or TOML)")
+    parser.add_argument("--rule-set", default="protein.default",
+                        help="CLASS.NAME of the rule set in --config (default: protein.default)")
+    parser.add_argument("--template-cache", help="directory of the parsed template cache")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="reload when --config changes, checking every SECONDS")
+    args = parser.parse_args(argv)
+
+    config = None
+    load_rules = lambda: Rules
+    if args.config:
+        config = ConfigFile(args.config, args.template_cache, args.watch or 1.0)
+        load_rules = config_loader(config, args.rule_set)
+    elif args.watch:
+        parser.error("--watch requires --config")
+    service = IdentifierService(load_rules=load_rules, jobs=args.jobs or None)
+    if config is not None and args.watch:
+        config.watch(lambda _: service.reload())
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=service.reload).start())
+    signal.signal(signal.SIGTERM, _terminate)  # shut down like on Ctrl-C
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if config is not None:
+            config.stop()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
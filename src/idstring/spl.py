@@ -1,8 +1,15 @@
 """ SPL document.
 
 """
+import mmap
+import os
+import threading
+
 from lxml import etree
 
+from idstring.archive import ArchiveMember
+from idstring.stats import observer
+
 
 class SplDocument(object):
     NAMESPACES = {"x": "urn:hl7-org:v3"}
@@ -32,21 +39,58 @@ class SplDocument(object):
         },
     }
 
-    def __init__(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as src:
-            doc = src.read()
-        self.dom = etree.fromstring(doc)
+    def __init__(self, source, huge_tree=False):
+        """
+        :source: file path, bytes, binary file object, mmap or ArchiveMember
+        :huge_tree: lift libxml2 limits on tree depth and text size
+        """
+        self.huge_tree = huge_tree
+        obs = observer()
+        if obs.enabled:
+            obs.count("bytes_parsed", source_size(source))
+        with obs.stage("parse"):
+            if isinstance(source, ArchiveMember):
+                with source.open() as src:
+                    self.dom = self.parse(src)
+            else:
+                self.dom = self.parse(source)
         self.document_ = None
         self.section_ = None
         self.substance_ = None
         self.substance_other_ = None
 
+    @classmethod
+    def from_mmap(cls, file_path, **kwargs):
+        """ Make document from a memory-mapped file.
+            Sources other than file paths, e.g. archive members, are
+            parsed as usual.
+        """
+        if not isinstance(file_path, (str, bytes, os.PathLike)):
+            return cls(file_path, **kwargs)
+        with open(file_path, 'rb') as src:
+            with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return cls(data, **kwargs)
+
+    def parse(self, source):
+        """ Return root element of the XML document.
+            Bytes and memory-mapped buffers are parsed in place,
+            paths and file objects are read by libxml2 directly.
+        """
+        parser = get_parser(self.huge_tree)
+        if isinstance(source, bytes):
+            return etree.fromstring(source, parser)
+        if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+            with memoryview(source) as view:
+                return etree.fromstring(view, parser)
+        if isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        return etree.parse(source, parser).getroot()
+
     def document(self):
         """ Return document element.
         """
         if self.document_ is None:
-            desc = self.SPLDescriptor["document"]
-            nodes = self.dom.xpath(desc["xpath"], namespaces=self.NAMESPACES)
+            nodes = XPATH["document"](self.dom)
             if len(nodes) != 1:
                 raise SPLDocumentError("Document element must be present and unique")
             self.document_ = nodes[0]
@@ -56,8 +100,7 @@ class SplDocument(object):
         """ Return section element
         """
         if self.section_ is None:
-            desc = self.SPLDescriptor["section"]
-            nodes = self.document().xpath(desc["xpath"], namespaces=self.NAMESPACES)
+            nodes = XPATH["section"](self.document())
             if len(nodes) != 1:
                 raise SPLDocumentError("Section element must be present and unique")
             self.section_ = nodes[0]
@@ -67,8 +110,7 @@ class SplDocument(object):
         """ Return main substance element.
         """
         if self.substance_ is None:
-            desc = self.SPLDescriptor["substance-main"]
-            nodes = self.section().xpath(desc["xpath"], namespaces=self.NAMESPACES)
+            nodes = XPATH["substance-main"](self.section())
             if len(nodes) != 1:
                 raise SPLDocumentError("Main substance element must be present and unique")
             self.substance_ = nodes[0]
@@ -76,17 +118,98 @@ class SplDocument(object):
 
     def substance_other(self):
         if self.substance_other_ is None:
-            desc = self.SPLDescriptor["substance-other"]
-            nodes = self.section().xpath(desc["xpath"], namespaces=self.NAMESPACES)
+            nodes = XPATH["substance-other"](self.section())
             self.substance_other_ = nodes
         return self.substance_other_
 
+    def set_id(self):
+        """ Return setId of the document, None if absent.
+        """
+        nodes = XPATH["document-set-id"](self.document())
+        return nodes[0] if nodes else None
+
+    def version_number(self):
+        """ Return versionNumber of the document, None if absent.
+        """
+        nodes = XPATH["document-version-number"](self.document())
+        return nodes[0] if nodes else None
+
     def select(self, base, query):
         """
         """
         return base.xpath(query, namespaces=self.NAMESPACES)
 
 
+def source_size(source):
+    """ Return size in bytes of a document source, 0 if unknown.
+    """
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if isinstance(source, ArchiveMember):
+        return source.size
+    try:
+        return os.path.getsize(source)
+    except (TypeError, OSError):
+        return 0
+
+
+_parsers = threading.local()
+
+
+def get_parser(huge_tree=False):
+    """ Return XML parser for SPL documents.
+        Parsers do not load DTDs, resolve entities or access the network.
+        lxml parsers must not be shared between threads, so one parser
+        per configuration is kept for each thread.
+    """
+    key = "huge_tree" if huge_tree else "default"
+    parser = getattr(_parsers, key, None)
+    if parser is None:
+        parser = etree.XMLParser(load_dtd=False, no_network=True, resolve_entities=False,
+                                 huge_tree=huge_tree)
+        setattr(_parsers, key, parser)
+    return parser
+
+
+XPATH = {}
+
+
+class CompiledXPath(object):
+    """ XPath expression compiled once and bound to SPL namespaces.
+        Evaluate by calling with a context element; XPath variables ($name)
+        are passed as keyword arguments.
+    """
+    __slots__ = ("query", "_xpath")
+
+    def __init__(self, query):
+        self.query = query
+        self._xpath = etree.XPath(query, namespaces=SplDocument.NAMESPACES, smart_strings=False)
+
+    def __call__(self, node, **variables):
+        obs = observer()
+        if obs.enabled:
+            obs.count("xpath_evaluations")
+        return self._xpath(node, **variables)
+
+
+def register_xpath(name, query):
+    """ Compile XPath query and register it by name.
+    :name: registry key
+    :query: XPath expression
+    """
+    compiled = CompiledXPath(query)
+    XPATH[name] = compiled
+    return compiled
+
+
+for _name, _desc in SplDocument.SPLDescriptor.items():
+    register_xpath(_name, _desc["xpath"])
+register_xpath("document-set-id", "./x:setId/@root")
+register_xpath("document-version-number", "./x:versionNumber/@value")
+
+
 class SPLDocumentError(Exception):
     def __init__(self, message):
         super().__init__(message)
@@ -0,0 +1,134 @@
+""" Instrumentation hooks.
+
+    Library code reports stage timings and counters to the current
+    observer. The default observer ignores everything; installing a
+    Stats object (see observing()) collects wall time per stage and
+    counts of moieties, bonds, XPath evaluations, template renders
+    and bytes parsed.
+
+    with observing(Stats()) as stats:
+        generate_identifier(path, templates)
+    print(stats.as_dict())
+"""
+import contextlib
+import time
+from collections import defaultdict
+
+
+class _NullStage(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class Observer(object):
+    """ Observer interface; this implementation ignores all events.
+    """
+    enabled = False
+    _null_stage = _NullStage()
+
+    def stage(self, name):
+        """ Return context manager that measures wall time of a stage.
+        """
+        return self._null_stage
+
+    def count(self, name, n=1):
+        """ Increment named counter.
+        """
+        pass
+
+
+class _Stage(object):
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Stats(Observer):
+    """ Observer that accumulates stage timings and counters.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def merge(self, other):
+        """ Add totals of another Stats object or of its as_dict() form.
+        """
+        if isinstance(other, Stats):
+            other = other.as_dict()
+        for name, value in other["stages"].items():
+            self.add_time(name, value["seconds"], value["calls"])
+        for name, value in other["counters"].items():
+            self.count(name, value)
+
+    def as_dict(self):
+        """ Return totals as a JSON serialisable dictionary.
+        """
+        return {
+            "stages": {name: {"seconds": self.seconds[name], "calls": self.calls[name]}
+                       for name in sorted(self.seconds)},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def metrics(self):
+        """ Return flat list of (metric name, value) pairs.
+        """
+        items = []
+        for name in sorted(self.seconds):
+            items.append(("stage.{}.seconds".format(name), self.seconds[name]))
+            items.append(("stage.{}.calls".format(name), self.calls[name]))
+        for name in sorted(self.counters):
+            items.append(("count.{}".format(name), self.counters[name]))
+        return items
+
+
+_observer = Observer()
+
+
+def observer():
+    """ Return current observer.
+    """
+    return _observer
+
+
+def install(obj):
+    """ Make obj the current observer; return the previous one.
+    """
+    global _observer
+    previous = _observer
+    _observer = obj if obj is not None else Observer()
+    return previous
+
+
+@contextlib.contextmanager
+def observing(obj):
+    """ Install observer for the duration of a with block.
+    """
+    previous = install(obj)
+    try:
+        yield obj
+    finally:
+        install(previous)
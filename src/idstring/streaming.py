@@ -0,0 +1,107 @@
+""" Streaming SPL document.
+
+    StreamingSplDocument parses the XML document incrementally with
+    etree.iterparse and keeps only the elements the protein model reads:
+    the document header, the indexing section and the moieties of the
+    identified substances. Everything else is cleared as soon as it has
+    been parsed, and alternative chemical structure representations
+    (e.g. a molfile next to an InChIKey) of auxiliary substances are
+    dropped once the preferred one is known.
+"""
+import io
+import os
+
+from lxml import etree
+
+from idstring.spl import SplDocument, register_xpath
+from idstring.model import get_chem_structure
+
+
+MAIN_SUBSTANCE_CODE_SYSTEM = "2.16.840.1.113883.4.9"
+
+DOCUMENT = ("document",)
+SECTION = DOCUMENT + ("component", "structuredBody", "component", "section")
+SUBSTANCE = SECTION + ("subject", "identifiedSubstance", "identifiedSubstance")
+
+KEEP_ELEMENTS = {
+    DOCUMENT,
+    DOCUMENT + ("id",),
+    DOCUMENT + ("code",),
+    DOCUMENT + ("effectiveTime",),
+    DOCUMENT + ("setId",),
+    DOCUMENT + ("versionNumber",),
+    DOCUMENT + ("component",),
+    DOCUMENT + ("component", "structuredBody"),
+    DOCUMENT + ("component", "structuredBody", "component"),
+    SECTION,
+    SECTION + ("code",),
+    SECTION + ("subject",),
+    SECTION + ("subject", "identifiedSubstance"),
+    SUBSTANCE,
+    SUBSTANCE + ("code",),
+}
+
+KEEP_SUBTREES = {
+    SUBSTANCE + ("asSpecializedKind",),
+    SUBSTANCE + ("moiety",),
+}
+
+MOIETY = SUBSTANCE + ("moiety",)
+
+xpath_chem_structure = register_xpath("streaming-chem-structure",
+                                      "./x:subjectOf[x:characteristic[x:code[@code=\"C103240\"]]]")
+xpath_chem_value = register_xpath("streaming-chem-value",
+                                  "./x:characteristic/x:value/text()")
+xpath_code_system = register_xpath("streaming-code-system", "./x:code/@codeSystem")
+
+
+class StreamingSplDocument(SplDocument):
+    """ SPL document that never materialises the full DOM.
+        Provides the same element accessors as SplDocument.
+    """
+
+    def parse(self, source):
+        """ Return root element of the pruned XML document.
+        :source: file path, bytes, binary file object or mmap
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        root = None
+        path = []
+        events = etree.iterparse(source, events=("start", "end"), load_dtd=False, no_network=True,
+                                 resolve_entities=False, huge_tree=self.huge_tree)
+        for event, elem in events:
+            if event == "start":
+                path.append(etree.QName(elem).localname)
+                if root is None:
+                    root = elem
+                continue
+
+            key = tuple(path)
+            path.pop()
+            if key in KEEP_ELEMENTS or key[:len(SUBSTANCE) + 1] in KEEP_SUBTREES:
+                if key == MOIETY:
+                    prune_chem_structures(elem)
+                continue
+            parent = elem.getparent()
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
+        return root
+
+
+def prune_chem_structures(moiety):
+    """ Drop chemical structure representations of an auxiliary substance
+        moiety other than the one the model selects.
+    """
+    substance = moiety.getparent()
+    if MAIN_SUBSTANCE_CODE_SYSTEM in xpath_code_system(substance):
+        return
+    value = get_chem_structure(moiety, None)
+    if value is None:
+        return
+    for node in xpath_chem_structure(moiety):
+        if value not in xpath_chem_value(node):
+            moiety.remove(node)
@@ -0,0 +1,46 @@
+import asyncio
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from idstring import aio
+from idstring.identifier_string import Templates, Rules, generate_identifier
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestAsyncApi(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = generate_identifier(PROTEIN_XML, Templates(Rules))
+
+    def test_generate_identifier(self):
+        self.assertEqual(self.expected, asyncio.run(aio.generate_identifier(PROTEIN_XML, Rules)))
+        with open(PROTEIN_XML, 'rb') as src:
+            data = src.read()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(self.expected,
+                             asyncio.run(aio.generate_identifier(data, Rules, executor=executor)))
+            with self.assertRaises(aio.IdentifierError) as error:
+                asyncio.run(aio.generate_identifier(b"<x", Rules, executor=executor))
+            self.assertTrue(str(error.exception).startswith("XMLSyntaxError"))
+
+    def test_generate_identifiers(self):
+        async def sources():
+            for path in [PROTEIN_XML, "missing.xml"] * 5:
+                yield path
+
+        async def collect(executor):
+            return [x async for x in aio.generate_identifiers(sources(), Rules, executor=executor,
+                                                              concurrency=3)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = asyncio.run(collect(executor))
+        self.assertEqual([PROTEIN_XML, "missing.xml"] * 5, [x.path for x in results])
+        self.assertEqual([self.expected, None] * 5, [x.identifier for x in results])
+        self.assertTrue(results[1].error.startswith("FileNotFoundError"))
+
+
+if __name__ == '__main__':
+    unittest.main()
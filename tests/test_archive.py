@@ -0,0 +1,77 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from idstring.archive import ArchiveMember, iter_archive
+from idstring.batch import iter_sources, run_batch
+from idstring.cache import IdentifierCache
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from idstring.spl import SplDocument
+from idstring.streaming import StreamingSplDocument
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with open(PROTEIN_XML, 'rb') as src:
+            self.data = src.read()
+        nested = io.BytesIO()
+        with zipfile.ZipFile(nested, "w") as archive:
+            archive.writestr("inner/b.xml", self.data)
+        self.zip_path = os.path.join(self.tmpdir, "spl.zip")
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("a.xml", self.data)
+            archive.writestr("readme.txt", "not a document")
+            archive.writestr("nested.zip", nested.getvalue())
+        self.tar_path = os.path.join(self.tmpdir, "spl.tar.gz")
+        with tarfile.open(self.tar_path, "w:gz") as archive:
+            archive.add(PROTEIN_XML, "docs/c.xml")
+            info = tarfile.TarInfo("docs/nested.zip")
+            info.size = len(nested.getvalue())
+            archive.addfile(info, io.BytesIO(nested.getvalue()))
+        self.templates = Templates(Rules)
+        self.expected = generate_identifier(PROTEIN_XML, self.templates)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iter_archive(self):
+        members = list(iter_archive(self.zip_path))
+        self.assertEqual(["a.xml", "inner/b.xml"], [x.name for x in members])
+        self.assertIsNone(members[0].data)
+        self.assertEqual(self.data, members[0].read())
+        self.assertEqual(self.zip_path + "!nested.zip!inner/b.xml", str(members[1]))
+        members = list(iter_archive(self.tar_path))
+        self.assertEqual(["docs/c.xml", "inner/b.xml"], [x.name for x in members])
+
+    def test_documents(self):
+        member = ArchiveMember(self.zip_path, "a.xml")
+        self.assertEqual(self.expected, generate_identifier(member, self.templates))
+        self.assertEqual(self.expected, generate_identifier(member, self.templates, document_class=StreamingSplDocument))
+        self.assertEqual("3", SplDocument(member).version_number())
+        self.assertEqual(self.expected, generate_identifier(member, self.templates, document_class=SplDocument.from_mmap))
+
+    def test_run_batch(self):
+        sources = list(iter_sources([self.zip_path, self.tar_path]))
+        self.assertEqual(4, len(sources))
+        self.assertEqual([str(x) for x in iter_sources([self.tar_path, self.zip_path])],
+                         [str(x) for x in iter_sources([self.tmpdir])])
+        results = list(run_batch(sources, self.templates, jobs=2, chunksize=1))
+        self.assertEqual([str(x) for x in sources], [x.path for x in results])
+        self.assertEqual([self.expected] * 4, [x.identifier for x in results])
+        with IdentifierCache(os.path.join(self.tmpdir, "cache.db"), Rules) as cache:
+            results = list(run_batch(sources, self.templates, cache=cache))
+            self.assertEqual([self.expected] * 4, [x.identifier for x in results])
+            self.assertEqual(1, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
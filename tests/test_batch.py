@@ -0,0 +1,94 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from idstring.batch import describe_source, iter_sources, open_output, run_batch, write_results
+from idstring.stats import Stats, observing
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_iter_sources(self):
+        stdin = io.StringIO("a.xml\n\nb.xml\n")
+        self.assertEqual(["x.xml", "a.xml", "b.xml"], list(iter_sources(["x.xml", "-"], stdin)))
+        root = os.path.dirname(PROTEIN_XML)
+        self.assertIn(PROTEIN_XML, list(iter_sources([root])))
+        self.assertIn(PROTEIN_XML, list(iter_sources([os.path.join(root, "prot*.xml")])))
+
+    def test_run_batch(self):
+        templates = Templates(Rules)
+        expected = generate_identifier(PROTEIN_XML, templates)
+        results = list(run_batch([PROTEIN_XML, "missing.xml", PROTEIN_XML], templates))
+        self.assertEqual([True, False, True], [x.ok for x in results])
+        self.assertEqual(expected, results[2].identifier)
+
+        out = io.StringIO()
+        self.assertEqual(1, write_results(results, out, "jsonl"))
+        records = [json.loads(x) for x in out.getvalue().splitlines()]
+        self.assertEqual("missing.xml", records[1]["path"])
+        self.assertIsNone(records[1]["identifier"])
+        self.assertEqual(expected, records[0]["identifier"])
+
+    def test_run_batch_parallel(self):
+        templates = Templates(Rules)
+        expected = generate_identifier(PROTEIN_XML, templates)
+        sources = [PROTEIN_XML, "missing.xml"] * 5
+        results = list(run_batch(sources, templates, jobs=2, chunksize=3))
+        self.assertEqual(sources, [x.path for x in results])
+        self.assertEqual([expected, None] * 5, [x.identifier for x in results])
+
+
+    def test_details_render_once(self):
+        templates = Templates(Rules)
+        with observing(Stats()) as stats:
+            result = describe_source(PROTEIN_XML, templates)
+        self.assertEqual(generate_identifier(PROTEIN_XML, templates), result.identifier)
+        items = sum(len(x) for x in result.fragments.values())
+        self.assertEqual(items + 1, stats.counters["template_renders"])
+
+    def test_details(self):
+        templates = Templates(Rules)
+        results = list(run_batch([PROTEIN_XML, "missing.xml"], templates, jobs=2, chunksize=1, details=True))
+        self.assertEqual(generate_identifier(PROTEIN_XML, templates), results[0].identifier)
+        self.assertEqual("24601a3f-ed30-4329-8eb6-1ff491870c85", results[0].set_id)
+        self.assertEqual("3", results[0].version_number)
+        self.assertEqual(["chains", "polymers", "substitutions"], sorted(results[0].fragments))
+        self.assertEqual(4, len(results[0].fragments["chains"]))
+        self.assertTrue(results[0].fragments["substitutions"][0].startswith("sub0:"))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "results.csv.gz")
+            with open_output(path) as out:
+                self.assertEqual(1, write_results(results, out, "csv", buffer_size=10))
+            with gzip.open(path, "rt", newline="") as src:
+                rows = list(csv.DictReader(src))
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(2, len(rows))
+        self.assertEqual(results[0].identifier, rows[0]["identifier"])
+        self.assertEqual("3", rows[0]["versionNumber"])
+        self.assertEqual(results[0].fragments, json.loads(rows[0]["fragments"]))
+        self.assertEqual("", rows[1]["fragments"])
+        self.assertTrue(rows[1]["error"])
+
+        out = io.StringIO()
+        self.assertEqual(1, write_results(results, out, "tsv", details=True))
+        lines = [x.split("\t") for x in out.getvalue().splitlines()]
+        self.assertEqual([6, 6], [len(x) for x in lines])
+        self.assertEqual([results[0].identifier, "", "24601a3f-ed30-4329-8eb6-1ff491870c85", "3"], lines[0][1:5])
+        self.assertEqual(results[0].fragments, json.loads(lines[0][5]))
+        self.assertEqual("", lines[1][5])
+
+
+if __name__ == '__main__':
+    unittest.main()
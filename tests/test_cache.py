@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from idstring.batch import run_batch
+from idstring.cache import IdentifierCache, rules_fingerprint
+from idstring.identifier_string import Templates, Rules, generate_identifier
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+def failing_document(source):
+    raise AssertionError("document parsed on cache hit")
+
+
+class TestIdentifierCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_put(self):
+        with IdentifierCache(self.path, Rules) as cache:
+            self.assertIsNone(cache.get("d1", "t"))
+            cache.put("d1", "t", "id1")
+            self.assertEqual("id1", cache.get("d1", "t"))
+            self.assertIsNone(cache.get("d1", "other"))
+
+    def test_lru_eviction(self):
+        with IdentifierCache(self.path, Rules, max_entries=2) as cache:
+            cache.put("d1", "t", "id1")
+            cache.put("d2", "t", "id2")
+            cache.get("d1", "t")
+            cache.put("d3", "t", "id3")
+            self.assertEqual(2, len(cache))
+            self.assertEqual("id1", cache.get("d1", "t"))
+            self.assertIsNone(cache.get("d2", "t"))
+
+    def test_invalidation(self):
+        with IdentifierCache(self.path, Rules) as cache:
+            cache.put("d1", "t", "id1")
+        with IdentifierCache(self.path, Rules) as cache:
+            self.assertEqual("id1", cache.get("d1", "t"))
+        rules = dict(Rules, chain="{{ name }}")
+        self.assertNotEqual(rules_fingerprint(Rules), rules_fingerprint(rules))
+        with IdentifierCache(self.path, rules) as cache:
+            self.assertIsNone(cache.get("d1", "t"))
+
+    def test_batch(self):
+        templates = Templates(Rules)
+        expected = generate_identifier(PROTEIN_XML, templates)
+        with IdentifierCache(self.path, Rules) as cache:
+            results = list(run_batch([PROTEIN_XML], templates, cache=cache))
+            self.assertEqual(expected, results[0].identifier)
+            results = list(run_batch([PROTEIN_XML] * 4, templates, jobs=2, chunksize=1,
+                                     cache=cache, document_class=failing_document))
+            self.assertEqual([expected] * 4, [x.identifier for x in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from idstring import identifier_string
+from idstring.config import ConfigError, ConfigFile, load_config
+from idstring.identifier_string import Rules, generate_identifier
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+TOML = """
+[protein.default]
+protein_identifier = "/chains={{ chains }}/poly={{ polymers }}/subs={{ substitutions }}"
+chain = "{{ name }}:{{ value }}"
+polymer = "{{ name }}:{{ value }}:{{ connection_points }}"
+substitution = "{{ name }}:{{ chain }}:{{ position }}:{{ polymer }}:{{ connection_point }}"
+attachment = "{{ chain }}:{{ position }}:{{ glycan }}"
+
+[protein.compact]
+protein_identifier = "/chains={{ chains|count }}"
+chain = "{{ name }}"
+"""
+
+
+class TestConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as out:
+            out.write(text)
+        return path
+
+    def test_formats(self):
+        toml_config = load_config(self.write("rules.toml", TOML))
+        self.assertEqual(Rules, toml_config.rules())
+        json_config = load_config(self.write("rules.json", json.dumps(Rules)))
+        self.assertEqual(Rules, json_config.rules("protein", "default"))
+        self.assertEqual([("protein", "compact"), ("protein", "default")], toml_config.names())
+
+    def test_rule_set(self):
+        config = load_config(self.write("rules.toml", TOML))
+        identifier = generate_identifier(PROTEIN_XML, config.templates("protein", "compact"))
+        self.assertEqual("/chains=4", identifier)
+        with self.assertRaises(ConfigError):
+            config.rules("protein", "missing")
+
+    def test_invalid(self):
+        with self.assertRaises(ConfigError):
+            load_config(self.write("rules.json", json.dumps({"protein": {"default": {"chain": 1}}})))
+        with self.assertRaises(ConfigError):
+            load_config(self.write("rules.ini", "chain = x"))
+
+    def test_template_cache(self):
+        cache_dir = os.path.join(self.tmpdir, "cache")
+        path = self.write("rules.toml", TOML)
+        load_config(path, cache_dir)
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+        identifier_string._compiled_templates.clear()
+        config = load_config(path, cache_dir)
+        template_str = config.rules("protein", "compact")["chain"]
+        self.assertIn(template_str, identifier_string._compiled_templates)
+
+    def test_reload(self):
+        path = self.write("rules.json", json.dumps({"chain": "a"}))
+        config_file = ConfigFile(path, interval=0)
+        loaded = []
+        config_file.listeners.append(loaded.append)
+        self.assertFalse(config_file.check())
+        self.write("rules.json", json.dumps({"chain": "bb"}))
+        self.assertTrue(config_file.check())
+        self.assertEqual({"chain": "bb"}, config_file.rules())
+        self.assertEqual(1, len(loaded))
+        self.write("rules.json", "{")
+        self.assertFalse(config_file.check())
+        self.assertIsNotNone(config_file.error)
+        self.assertEqual({"chain": "bb"}, config_file.rules())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic import make_document
+from idstring.__main__ import main
+from idstring.batch import run_batch
+from idstring.duplicates import DuplicateIndex, DuplicateIndexError, index_record
+from idstring.identifier_string import Templates, Rules
+
+
+class TestDuplicateIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmpdir, "index.db")
+        self.paths = []
+        for name, data in [("a.xml", make_document(version=1)),
+                           ("b.xml", make_document(version=2)),
+                           ("c.xml", make_document(substitutions=8)),
+                           ("d.xml", make_document(seed=1))]:
+            path = os.path.join(self.tmpdir, name)
+            with open(path, 'wb') as out:
+                out.write(data)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lookups(self):
+        a, b, c, d = self.paths
+        results = run_batch(self.paths + ["missing.xml"], Templates(Rules), details=True)
+        with DuplicateIndex(self.db, Rules) as index:
+            self.assertEqual(5, len(list(index.index_results(results, batch_size=2))))
+            self.assertEqual(4, len(index))
+            record = index.get(a)
+            self.assertEqual([b], index.same_identifier(record))
+            self.assertEqual([c], index.same_chains(record))
+            self.assertEqual([], index.same_identifier(index.get(d)))
+            self.assertEqual([[a, b]], list(index.duplicates()))
+            self.assertIsNone(record.sections["attachments"])
+
+        with self.assertRaises(DuplicateIndexError):
+            DuplicateIndex(self.db, dict(Rules, chain="{{ name }}"))
+        with DuplicateIndex(self.db, Rules) as index:
+            self.assertEqual(4, len(index))
+        with DuplicateIndex(self.db, dict(Rules, chain="{{ name }}"), reset=True) as index:
+            self.assertEqual(0, len(index))
+
+    def test_requires_details(self):
+        result = next(run_batch(self.paths[:1], Templates(Rules)))
+        with self.assertRaises(ValueError):
+            index_record(result)
+
+    def test_cli(self):
+        self.assertEqual(0, main(["--batch", "--index", self.db, "-o", os.path.join(self.tmpdir, "out.tsv")]
+                                 + self.paths))
+        with DuplicateIndex(self.db, Rules) as index:
+            self.assertEqual(1, len(list(index.duplicates())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from idstring.identifier_string import IdentifierStringTemplate, Templates, TextGenerator
+from idstring import identifier_string
+from idstring.identifier_string import IdentifierStringTemplate, Templates, TextGenerator, compile_template
+from idstring.identifier_string import parse, TemplateParserError, register_filter
 
 
 class TestTextGenerator(unittest.TestCase):
@@ -17,6 +19,107 @@ class TestTextGenerator(unittest.TestCase):
         self.assertEqual(identifier.to_string("/chains={{ chains }}/poly={{ polymers }}"), 
                         "/chains=c1:A;c2:AA;c3:ABC/poly=poly1:A;poly2:AA")
 
+    def test_compiled_template_cache(self):
+        compiled = compile_template("{{ name }}:{{ value }}")
+        self.assertIs(compiled, compile_template("{{ name }}:{{ value }}"))
+        self.assertIs(compiled, TextGenerator("{{ name }}:{{ value }}").compiled)
+        self.assertEqual(("name", "value"), compiled.variable_names)
+        self.assertEqual("c1:A", compiled.render({"name": "c1", "value": "A"}))
+
+    def test_compiled_template_cache_bound(self):
+        compiled = compile_template("{{ name }}")
+        for n in range(identifier_string.MAX_COMPILED_TEMPLATES):
+            compile_template("{{ name }}:" + str(n))
+            compile_template("{{ name }}")
+        self.assertEqual(identifier_string.MAX_COMPILED_TEMPLATES, len(identifier_string._compiled_templates))
+        self.assertIs(compiled, compile_template("{{ name }}"))
+        self.assertNotIn("{{ name }}:0", identifier_string._compiled_templates)
+
+    def test_write_chunks(self):
+        identifier = IdentifierStringTemplate(Templates(Rules))
+        MockModel().accept(identifier)
+        template_str = "/chains={{ chains }}/poly={{ polymers }}/{{ missing }}"
+        chunks = []
+        identifier.write(template_str, chunks.append, chunk_size=8)
+        self.assertEqual(identifier.to_string(template_str), "".join(chunks))
+        self.assertLess(1, len(chunks))
+        out = []
+        compile_template(template_str).render_into(identifier.context, out)
+        self.assertEqual(["/chains=", "c1", ":", "A", ";"], out[:5])
+
+    def test_string_template(self):
+        t = Templates(Rules).make_instance_of("chain")
+        t.load(MockChain("c1", "A"))
+        self.assertEqual("c1:A", t.to_string())
+
+
+class TestParser(unittest.TestCase):
+
+    def test_nodes(self):
+        nodes = parse("{{ a }}{{ b }}/x")
+        self.assertEqual(["", "a", "", "b", "/x"],
+                         [x.value if hasattr(x, "value") else x.variable.name for x in nodes])
+
+    def test_transforms(self):
+        nodes = parse('/c={{ chains|sort|join:";" }}/p={{ polymers|join:",",x }}')
+        chains = nodes[1].variable
+        self.assertEqual("chains", chains.name)
+        self.assertEqual(["sort", "join"], [x.func_name for x in chains.transforms])
+        self.assertEqual([[], [";"]], [x.params for x in chains.transforms])
+        self.assertEqual([",", "x"], nodes[3].variable.transforms[0].params)
+
+    def test_errors(self):
+        for template, offset in [("abc{{ name", 10), ("{{ }}", 3), ("{{ a|join: }}", 10), ("{{ a|}}", 5)]:
+            with self.assertRaises(TemplateParserError) as ctx:
+                parse(template)
+            self.assertEqual(offset, ctx.exception.offset, template)
+
+    def test_large_template(self):
+        template = "".join("/s{}={{{{ v{} }}}}".format(i, i) for i in range(20000))
+        nodes = parse(template)
+        self.assertEqual(40000, len(nodes))
+        self.assertEqual("v19999", nodes[-1].variable.name)
+
+
+class TestFilters(unittest.TestCase):
+
+    def setUp(self):
+        identifier = IdentifierStringTemplate(Templates(Rules))
+        MockModel().accept(identifier)
+        identifier.context["chains"].reverse()
+        identifier.context["polymers"].append(identifier.context["polymers"][0])
+        self.identifier = identifier
+
+    def test_builtin_filters(self):
+        render = self.identifier.to_string
+        self.assertEqual("c3:ABC;c2:AA;c1:A", render("{{ chains }}"))
+        self.assertEqual("c1:A,c2:AA,c3:ABC", render('{{ chains|sort|join:"," }}'))
+        self.assertEqual("poly1:A;poly2:AA", render("{{ polymers|unique }}"))
+        self.assertEqual("3", render("{{ chains|count }}"))
+        self.assertEqual("2", render("{{ polymers|unique|count }}"))
+        self.assertEqual("C3:ABC", render("{{ chains|first|upper }}"))
+        self.assertEqual("POLY1:A/POLY2:AA", render("{{ polymers|unique|upper|join:/ }}"))
+        self.assertEqual(64, len(render("{{ chains|sort|hash }}")))
+        self.assertEqual(render("{{ chains|sort|join|hash }}"), render("{{ chains|sort|hash }}"))
+        self.assertEqual(32, len(render("{{ chains|hash:md5 }}")))
+
+    def test_user_filter(self):
+        register_filter("lengths", lambda value: (str(len(x)) for x in value))
+        self.assertEqual("6;5;4", self.identifier.to_string("{{ chains|lengths }}"))
+
+    def test_reregister_filter(self):
+        register_filter("shout", lambda value: value.upper())
+        templates = Templates({"x": "{{ name|shout }}"})
+        register_filter("shout", lambda value: value + "!")
+        t = templates.make_instance_of("x")
+        t.load(MockChain("abc", "A"))
+        self.assertEqual("abc!", t.to_string())
+        self.assertEqual("abc!", compile_template("{{ name|shout }}").render({"name": "abc"}))
+
+    def test_unknown_filter(self):
+        with self.assertRaises(TemplateParserError):
+            compile_template("{{ chains|nosuchfilter }}")
+
 
 Rules = {
     "chain" : "{{ name }}:{{ value }}",
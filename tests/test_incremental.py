@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic import make_document
+from idstring import incremental
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from idstring.incremental import IncrementalState
+from idstring.model import SplModelProtein
+from idstring.spl import SplDocument
+from idstring.stats import Stats, observing
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+def change_chain(data, index=0):
+    """ Return document with one residue of a chain replaced.
+    """
+    value = SplModelProtein(SplDocument(data)).chains.chains[index].value
+    changed = ("W" if value[0] != "W" else "Y") + value[1:]
+    return data.replace(value.encode("ascii"), changed.encode("ascii"))
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.templates = Templates(Rules)
+
+    def test_unchanged_version(self):
+        state = IncrementalState()
+        first = incremental.generate_identifier(make_document(version=1, attachments=2), self.templates, state)
+        with observing(Stats()) as stats:
+            second = incremental.generate_identifier(make_document(version=2, attachments=2), self.templates, state)
+        self.assertEqual(first, second)
+        self.assertEqual(first, generate_identifier(make_document(version=2, attachments=2), self.templates))
+        self.assertEqual(4 + 1, stats.counters["moieties_reused"])
+        self.assertLess(0, stats.counters["fragments_reused"])
+
+    def test_changed_chain(self):
+        state = IncrementalState()
+        first = make_document(chains=6, substitutions=20, attachments=3)
+        incremental.generate_identifier(first, self.templates, state)
+        for index in range(6):
+            data = change_chain(first, index)
+            with observing(Stats()) as stats:
+                identifier = incremental.generate_identifier(data, self.templates, state)
+            self.assertEqual(generate_identifier(data, self.templates), identifier)
+            self.assertLess(0, stats.counters["moieties_reused"])
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "protein.state")
+            state = IncrementalState.load(path)
+            self.assertEqual({}, state.entities)
+            expected = incremental.generate_identifier(PROTEIN_XML, self.templates, state)
+            state.save(path)
+            state = IncrementalState.load(path)
+            with observing(Stats()) as stats:
+                self.assertEqual(expected, incremental.generate_identifier(PROTEIN_XML, self.templates, state))
+            self.assertEqual(len(state.entities), stats.counters["moieties_reused"])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import collections
+import os
+import random
+import re
+import unittest
+
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from benchmarks.synthetic import make_document
+from idstring.model import BondIndex, SplModelProtein
+from idstring.sequence import SequenceAnalysis, SequencePool, sequence_digest
+from idstring.spl import SPLDocumentError
+from idstring.spl import SplDocument
+from idstring.stats import Stats, observing
+from idstring.model import Chain, Polymer, Substitution, SubstitutionPoint, AttachmentPoint, sort_key
+
+
+class Named(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class TestSortKeys(unittest.TestCase):
+
+    def make_substitutions(self):
+        poly = Named("poly0")
+        chains = [Named("chain{}".format(i)) for i in range(3)]
+        subs = []
+        for chain in chains:
+            for pos in (22, 96, 144, 367):
+                subs.append(Substitution([SubstitutionPoint(poly, 2, chain, pos + 60),
+                                          SubstitutionPoint(poly, 1, chain, pos)]))
+        return subs
+
+    def test_substitution_total_order(self):
+        subs = self.make_substitutions()
+        expected = [x.sort_key for x in sorted(subs, key=sort_key)]
+        for seed in range(5):
+            random.Random(seed).shuffle(subs)
+            self.assertEqual(expected, [x.sort_key for x in sorted(subs, key=sort_key)])
+            self.assertEqual(expected, [x.sort_key for x in sorted(subs)])
+        self.assertEqual(("poly0", 1, "chain0", 22), expected[0][0])
+        self.assertEqual(("poly0", 1, "chain0", 96), expected[1][0])
+
+    def test_points(self):
+        sub = self.make_substitutions()[0]
+        self.assertEqual([1, 2], [x.connection_point for x in sub.points])
+        chain = Named("chain0")
+        points = [AttachmentPoint("g2", chain, 5), AttachmentPoint("g1", chain, 9), AttachmentPoint("g1", chain, 3)]
+        self.assertEqual([("g1", "chain0", 3), ("g1", "chain0", 9), ("g2", "chain0", 5)],
+                         [x.sort_key for x in sorted(points, key=sort_key)])
+
+
+class TestCompactEntities(unittest.TestCase):
+
+    def test_slots(self):
+        chain = Chain("SU1", "ACD", None)
+        chain.name = "chain0"
+        poly = Polymer("cys-cys", "KEY", [], None)
+        poly.name = "poly0"
+        point = SubstitutionPoint(poly, 1, chain, 22)
+        point.name = "sub0"
+        attachment = AttachmentPoint("glycan", chain, 5)
+        for entity in (chain, poly, point, attachment, Substitution([point])):
+            self.assertFalse(hasattr(entity, "__dict__"))
+        self.assertEqual("chain0:22:poly0:1", point.value)
+        self.assertEqual("chain0:5:glycan", attachment.value)
+
+        t = Templates(Rules).make_instance_of("substitution")
+        t.load(point)
+        self.assertEqual("sub0:chain0:22:poly0:1", t.to_string())
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestLazyModel(unittest.TestCase):
+
+    def test_sections_loaded_on_demand(self):
+        model = SplModelProtein(SplDocument(PROTEIN_XML))
+        self.assertIsNone(model._chains)
+        self.assertEqual(4, len(model.chains.chains))
+        self.assertIsNone(model._polymers)
+        self.assertIsNone(model._modifications)
+        self.assertEqual(16, len(model.modifications.substitutions))
+        self.assertIsNotNone(model._polymers)
+
+    def test_chains_only_template(self):
+        rules = dict(Rules, chains_only="/chains={{ chains }}")
+        with observing(Stats()) as stats:
+            identifier = generate_identifier(PROTEIN_XML, Templates(rules), "chains_only")
+        self.assertTrue(identifier.startswith("/chains=chain0:"))
+        self.assertEqual({"parse", "model.chains", "render"}, set(stats.seconds))
+        self.assertNotIn("bonds", stats.counters)
+
+
+class TestBondIndex(unittest.TestCase):
+
+    def test_index(self):
+        doc = SplDocument(PROTEIN_XML)
+        index = BondIndex(doc.substance())
+        self.assertEqual(16, len(index.moieties))
+        code, substitutions, attachments = index.moieties[0]
+        self.assertEqual("cys-cys", code)
+        self.assertEqual((("SU1", (1, 22)), ("SU1", (2, 96))), substitutions)
+        self.assertEqual((), attachments)
+
+    def test_modifications_without_bond_xpath(self):
+        model = SplModelProtein(SplDocument(make_document(substitutions=8, attachments=4)))
+        model.chains, model.polymers
+        with observing(Stats()) as stats:
+            modifications = model.modifications
+        self.assertEqual(8, len(modifications.substitutions))
+        self.assertEqual(4, len(modifications.attachments))
+        self.assertEqual(20, stats.counters["bonds"])
+        self.assertNotIn("xpath_evaluations", stats.counters)
+
+
+class TestSequenceInterning(unittest.TestCase):
+
+    def test_pool(self):
+        pool = SequencePool(max_chars=8)
+        value, digest = pool.intern("".join(["AC", "D"]))
+        self.assertIs(value, pool.intern("ACD")[0])
+        self.assertEqual(sequence_digest("ACD"), digest)
+        pool.intern("EF")
+        pool.analyze("ACD")
+        self.assertEqual(8, pool.size)
+        pool.intern("GH")
+        self.assertEqual(["ACD", "GH"], list(pool._entries))
+        self.assertEqual(8, pool.size)
+        pool.intern("ABCDEFGHI")
+        self.assertEqual((0, 0), (len(pool), pool.size))
+
+    def test_chains_share_sequences(self):
+        first = SplModelProtein(SplDocument(PROTEIN_XML)).chains.chains
+        second = SplModelProtein(SplDocument(PROTEIN_XML)).chains.chains
+        self.assertIs(first[0].value, first[1].value)
+        self.assertIs(first[0].value, second[0].value)
+        self.assertEqual([214, 214, 447, 447], [x.length for x in first])
+        self.assertEqual(sequence_digest(first[2].value), first[2].digest)
+
+    def test_digest_template(self):
+        rules = dict(Rules, chain="{{ name }}:{{ length }}:{{ digest }}", digests="{{ chains }}")
+        identifier = generate_identifier(PROTEIN_XML, Templates(rules), "digests")
+        chains = SplModelProtein(SplDocument(PROTEIN_XML)).chains.chains
+        self.assertEqual("chain0:214:{}".format(chains[0].digest), identifier.split(";")[0])
+
+        rules = dict(Rules, chain="{{ name }}:{{ value|digest }}", digests="{{ chains }}")
+        self.assertEqual("chain0:{}".format(chains[0].digest),
+                         generate_identifier(PROTEIN_XML, Templates(rules), "digests").split(";")[0])
+
+
+class TestSequenceAnalysis(unittest.TestCase):
+
+    def test_analysis(self):
+        value = "".join(random.Random(0).choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(100000))
+        analysis = SequenceAnalysis(value)
+        counts = collections.Counter(value)
+        self.assertEqual("".join("{}{}".format(x, counts[x]) for x in sorted(counts)), analysis.composition)
+        self.assertTrue(analysis.valid)
+        positions = list(range(1, 100001, 997))
+        self.assertEqual("".join(value[x - 1] for x in positions), analysis.residues(positions))
+        self.assertEqual([0, 100001], analysis.out_of_range([0, 1, 100000, 100001]))
+        self.assertEqual("1a", SequenceAnalysis("AC1aC").invalid)
+        self.assertEqual("A1C2", SequenceAnalysis("AC1aC").composition)
+
+    def test_template_variables(self):
+        model = SplModelProtein(SplDocument(PROTEIN_XML))
+        chain = model.chains.chains[0]
+        self.assertEqual(chain.length, sum(map(int, re.findall(r"\d+", chain.composition))))
+        self.assertEqual("", chain.invalid_residues)
+        self.assertEqual({"C"}, {x.residue for x in model.modifications.sub_points})
+        t = Templates(dict(Rules, chain="{{ name }}:{{ length }}:{{ composition }}")).make_instance_of("chain")
+        t.load(chain)
+        self.assertEqual("chain0:214:" + chain.composition, t.to_string())
+
+    def test_position_outside_chain(self):
+        data = make_document(chains=1, substitutions=1, length=50)
+        data = re.sub(rb'(<positionNumber value="1" />\s*<positionNumber value=")\d+', rb"\g<1>51", data)
+        with self.assertRaises(SPLDocumentError):
+            SplModelProtein(SplDocument(data)).modifications
+
+
+if __name__ == '__main__':
+    unittest.main()
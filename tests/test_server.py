@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from idstring.config import ConfigFile
+from idstring.server import IdentifierService, config_loader, make_server
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = IdentifierService(jobs=1)
+        cls.server = make_server(cls.service, port=0)
+        cls.url = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        cls.service.close()
+
+    def request(self, path, data=None, method=None):
+        try:
+            with urlopen(Request(self.url + path, data=data, method=method)) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_endpoints(self):
+        expected = generate_identifier(PROTEIN_XML, Templates(Rules))
+        self.assertEqual((200, {"status": "ok"}), self.request("/health"))
+
+        with open(PROTEIN_XML, 'rb') as src:
+            status, body = self.request("/identifier", src.read())
+        self.assertEqual((200, expected), (status, body["identifier"]))
+
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertEqual((200, expected), (status, body["identifier"]))
+
+        status, body = self.request("/identifier", b"<not-spl/>")
+        self.assertEqual(422, status)
+        self.assertIsNotNone(body["error"])
+
+        generation = self.service.generation
+        self.assertEqual((200, {"generation": generation + 1}), self.request("/reload", b""))
+
+        for pid in list(self.service._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertEqual(503, status)
+        self.assertIn("BrokenProcessPool", body["error"])
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertEqual((200, expected), (status, body["identifier"]))
+        status, body = self.request("/stats")
+        self.assertEqual(4, body["counters"]["documents"])
+        self.assertEqual(1, body["counters"]["errors"])
+        self.assertEqual(1, body["counters"]["pool_restarts"])
+
+
+class TestServiceClose(unittest.TestCase):
+
+    def test_identify_after_close(self):
+        service = IdentifierService(jobs=1)
+        self.assertIsNone(service.identify(PROTEIN_XML)[1])
+        service.close()
+        with self.assertRaises(RuntimeError):
+            service.identify(PROTEIN_XML)
+
+
+class TestServerConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "rules.json")
+        self.write(Rules)
+        self.service = IdentifierService(config_loader(ConfigFile(self.path)), jobs=1)
+        self.server = make_server(self.service, port=0)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.service.close()
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, rules):
+        with open(self.path, 'w') as out:
+            json.dump(rules, out)
+
+    def request(self, path, data=None):
+        try:
+            with urlopen(Request(self.url + path, data=data)) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_reload_reads_changed_file(self):
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertTrue(body["identifier"].startswith("/chains=chain0:"))
+        self.write(dict(Rules, protein_identifier="/chains={{ chains|count }}"))
+        self.assertEqual(200, self.request("/reload", b"")[0])
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertEqual("/chains=4", body["identifier"])
+
+        with open(self.path, 'w') as out:
+            out.write("{")
+        self.assertEqual(500, self.request("/reload", b"")[0])
+        status, body = self.request("/identifier?path=" + PROTEIN_XML, b"")
+        self.assertEqual("/chains=4", body["identifier"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import io
+import os
+import unittest
+
+from idstring.spl import SplDocument, XPATH
+from idstring.model import Polymers
+from idstring.streaming import StreamingSplDocument
+from idstring.identifier_string import Templates, Rules, generate_identifier
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestSplDocument(unittest.TestCase):
+
+    def test_descriptor_queries_registered(self):
+        for name in SplDocument.SPLDescriptor:
+            self.assertIn(name, XPATH)
+
+    def test_document_elements(self):
+        doc = SplDocument(PROTEIN_XML)
+        self.assertEqual(1, len(XPATH["document"](doc.dom)))
+        self.assertIsNotNone(doc.substance())
+        self.assertEqual(1, len(doc.substance_other()))
+
+    def test_parameterised_query(self):
+        doc = SplDocument(PROTEIN_XML)
+        subject = doc.substance_other()[0]
+        self.assertEqual(1, len(Polymers.xpath_moiety(subject, code="48TCX9A1VT")))
+        self.assertEqual(0, len(Polymers.xpath_moiety(subject, code="\"missing")))
+
+    def test_sources(self):
+        expected = Polymers(SplDocument(PROTEIN_XML)).polymers[0].value
+        with open(PROTEIN_XML, 'rb') as src:
+            data = src.read()
+        for doc_class in (SplDocument, StreamingSplDocument):
+            docs = [doc_class(data),
+                    doc_class(bytearray(data)),
+                    doc_class(io.BytesIO(data)),
+                    doc_class.from_mmap(PROTEIN_XML),
+                    doc_class(PROTEIN_XML, huge_tree=True)]
+            for doc in docs:
+                self.assertEqual(expected, Polymers(doc).polymers[0].value)
+
+
+class TestStreamingSplDocument(unittest.TestCase):
+
+    def test_identifier(self):
+        templates = Templates(Rules)
+        self.assertEqual(generate_identifier(PROTEIN_XML, templates),
+                         generate_identifier(PROTEIN_XML, templates, document_class=StreamingSplDocument))
+
+    def test_pruned_tree(self):
+        doc = StreamingSplDocument(PROTEIN_XML)
+        self.assertEqual([], doc.select(doc.dom, "//x:author"))
+        self.assertEqual([], doc.select(doc.dom, "//x:value[@mediaType=\"application/x-mdl-molfile\"]"))
+        self.assertEqual(1, len(doc.select(doc.dom, "//x:value[@mediaType=\"application/x-inchi-key\"]")))
+        self.assertEqual(1, len(doc.select(doc.dom, "/x:document/x:versionNumber")))
+
+
+if __name__ == '__main__':
+    unittest.main()
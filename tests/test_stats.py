@@ -0,0 +1,44 @@
+import os
+import unittest
+
+from idstring.batch import run_batch
+from idstring.identifier_string import Templates, Rules, generate_identifier
+from idstring.stats import Observer, Stats, observer, observing
+
+
+PROTEIN_XML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "protein.xml")
+
+
+class TestStats(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertFalse(observer().enabled)
+        with observer().stage("parse"):
+            observer().count("documents")
+
+    def test_collect(self):
+        with observing(Stats()) as stats:
+            self.assertIs(stats, observer())
+            generate_identifier(PROTEIN_XML, Templates(Rules))
+        self.assertIsInstance(observer(), Observer)
+        self.assertFalse(observer().enabled)
+
+        totals = stats.as_dict()
+        self.assertEqual({"parse", "model.chains", "model.polymers", "model.modifications", "render"},
+                         set(totals["stages"]))
+        self.assertEqual(1, totals["counters"]["documents"])
+        self.assertEqual(32, totals["counters"]["bonds"])
+        self.assertEqual(os.path.getsize(PROTEIN_XML), totals["counters"]["bytes_parsed"])
+        self.assertGreater(totals["counters"]["xpath_evaluations"], 0)
+        self.assertGreater(totals["counters"]["template_renders"], 0)
+        self.assertIn(("count.documents", 1), stats.metrics())
+
+    def test_merge_from_workers(self):
+        with observing(Stats()) as stats:
+            list(run_batch([PROTEIN_XML] * 3, Templates(Rules), jobs=2, chunksize=1))
+        self.assertEqual(3, stats.counters["documents"])
+        self.assertEqual(3, stats.calls["parse"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from benchmarks.synthetic import make_document
+from idstring.model import SplModelProtein
+from idstring.spl import SplDocument
+
+
+class TestSyntheticDocument(unittest.TestCase):
+
+    def test_counts(self):
+        data = make_document(chains=3, irregular=2, substitutions=5, attachments=4, length=100)
+        model = SplModelProtein(SplDocument(data))
+        self.assertEqual(3, len(model.chains.chains))
+        self.assertEqual(2, len(model.polymers.polymers))
+        self.assertEqual(5, len(model.modifications.substitutions))
+        self.assertEqual(10, len(model.modifications.sub_points))
+        self.assertEqual(4, len(model.modifications.attachments))
+        self.assertEqual(100, len(model.chains.chains[0].value))
+
+    def test_deterministic(self):
+        self.assertEqual(make_document(seed=1), make_document(seed=1))
+        self.assertNotEqual(make_document(seed=1), make_document(seed=2))
+
+
+if __name__ == '__main__':
+    unittest.main()